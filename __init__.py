@@ -11,8 +11,12 @@ bl_info = {
 
 import bpy
 from . import functions
+from . import api
+from . import cache
 from . import operators
 from . import panels
+from . import tasks
+from . import journal
 from bpy.app.handlers import persistent
 
 """
@@ -29,9 +33,14 @@ def register():
     # bpy.app.handlers.load_post.append(load_handler)
     operators.register()
     panels.register()
+    cache.register()
+    journal.register()
 
 
 def unregister():
+    tasks.unregister()
+    journal.unregister()
+    cache.unregister()
     operators.unregister()
     panels.unregister()
 
@@ -0,0 +1,135 @@
+"""Python API of the Ammonite Pipeline.
+
+Plain functions working on bpy.data, without operators, so they don't need
+a window or the UI context and can be called from the farm scripts under
+"blender -b":
+
+    blender -b shot.blend --python-expr "import ammopipe.api as api; ..."
+
+    scene = bpy.data.scenes["_scene_source"]
+    api.organize(scene, "hero")
+    api.new_scene("scene", "sh010")
+    api.export(api.shot_scenes(), "//scenes")
+    bpy.ops.wm.save_mainfile()
+
+The operators of the add-on are thin wrappers around these functions.
+"""
+
+import bpy
+from typing import Dict, List, Tuple
+
+from . import functions
+from .journal import journal
+
+
+def source_scene():
+    """The Scene marked as Source, None if there is none"""
+    for scene in bpy.data.scenes:
+        if scene.ammopipe_source_scene:
+            return scene
+    return None
+
+
+def shot_scenes() -> List:
+    """All the Scenes but the Source one"""
+    return [scene for scene in bpy.data.scenes if not scene.ammopipe_source_scene]
+
+
+def _source_scene(scene):
+    scene = scene or source_scene()
+    if scene is None:
+        raise ValueError("No Scene is marked as Source")
+    return scene
+
+
+def organize(scene, asset_name) -> Tuple:
+    """Put the Scene Objects into the Asset Collections and rename them.
+    The already organized Scene isn't touched at all.
+    Return the number of applied actions and of renamed blocks"""
+    return functions.run_steps(organize_steps(scene, asset_name))
+
+
+def organize_steps(scene, asset_name, progress=None):
+    """organize() as a generator yielding the progress after every block,
+    see functions.Progress. Stopping it half way leaves the Scene half organized"""
+    if not asset_name:
+        raise ValueError("Asset Name can't be empty")
+    if progress is None:
+        progress = functions.Progress()
+    # Planning goes through the Objects twice, placing and renaming them
+    progress.total += 2 * len(scene.objects)
+    plan = yield from progress.track(functions.plan_organize_steps(scene, asset_name))
+    if not len(plan):
+        renames = yield from progress.track(functions.plan_rename_objects_steps(scene, asset_name))
+        if not renames:
+            return (0, 0)
+    else:
+        progress.total += len(plan)
+        # Linking and unlinking resets the "viewport hide" of the Objects
+        view_layers_state = functions.capture_view_layers_state(scene)
+        if journal.recording:
+            journal.view_layers(scene, view_layers_state)
+        try:
+            yield from progress.track(plan.apply_steps())
+        finally:
+            functions.restore_view_layers_state(scene, view_layers_state)
+        renames = yield from progress.track(functions.plan_rename_objects_steps(scene, asset_name))
+    progress.total += len(renames)
+    reports = yield from progress.track(functions.rename_blocks_steps(renames))
+    return (len(plan), sum(len(report["renamed"]) for report in reports.values()))
+
+
+def rename(scene, asset_name) -> Dict:
+    """Rename the Scene Objects and their Data after their Collections.
+    Return bpy.data collection name -> batch_rename() report"""
+    return functions.rename_objects(scene, asset_name)
+
+
+def rename_blocks(renames) -> Dict:
+    """Rename the local blocks (block -> new name) in a batch per type.
+    Return bpy.data collection name -> batch_rename() report"""
+    return functions.rename_blocks(renames)
+
+
+def new_scene(name, suffix="", source=None) -> bpy.types.Scene:
+    """New Scene from the Source Scene, sharing its "Link" Collections
+    and holding copies of the "Copy" ones"""
+    return functions.new_scene(_source_scene(source), name, suffix)
+
+
+def create_shots(shots, source=None) -> List:
+    """New Scene from the Source Scene for every shot, see functions.load_shots().
+    Return (Scene, seconds it took) per shot"""
+    return functions.create_shots(_source_scene(source), shots)
+
+
+def localize(scene, collection) -> bpy.types.Collection:
+    """Replace the shared Collection (or its name) in the Scene with a local copy.
+    Return the copy"""
+    if isinstance(collection, str):
+        collection = bpy.data.collections[collection]
+    return functions.localize_collection(scene, collection)
+
+
+def delete_scene(scene) -> Dict:
+    """Delete the Scene with the data only it uses.
+    Return ID type -> (removed count, estimated bytes freed)"""
+    if len(bpy.data.scenes) < 2:
+        raise ValueError("The last Scene can't be deleted")
+    return functions.delete_scene(scene)
+
+
+def export(scenes, directory, force=False, fingerprints=None) -> Dict:
+    """Write every Scene with the IDs it needs into its own .blend in the directory,
+    the up to date files are skipped unless forced. The open file isn't saved.
+    Return Scene name -> file path of the written Scenes"""
+    return functions.write_scenes(scenes, directory, fingerprints, force)
+
+
+def override_and_snap(empties, scene=None, view_layer=None) -> List:
+    """Override the rigged assets instanced by the Empties and snap the Rigs to them.
+    Return (Empty name, error or None) per Empty"""
+    scene = scene or bpy.context.scene
+    view_layer = view_layer or scene.view_layers[0]
+    empties = [ob for ob in empties if functions.is_collection_instance(ob)]
+    return functions.override_and_snap(empties, scene, view_layer)
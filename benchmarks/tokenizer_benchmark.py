@@ -0,0 +1,80 @@
+"""Compare seperate_string_number() with the implementation it replaced.
+
+Run from the add-on folder, Blender is not needed:
+
+    python benchmarks/tokenizer_benchmark.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import naming
+
+
+def seperate_string_number_legacy(string):
+    """The quadratic implementation, kept here for the comparison only"""
+    previous_character = string[0]
+    groups = []
+    newword = string[0]
+    for x, i in enumerate(string[1:]):
+        if i.isalpha() and previous_character.isalpha():
+            newword += i
+        elif i.isnumeric() and previous_character.isnumeric():
+            newword += i
+        else:
+            groups.append(newword)
+            newword = i
+
+        previous_character = i
+
+        if x == len(string) - 2:
+            groups.append(newword)
+            newword = ""
+
+        state = False
+        for item in groups:
+            if item.isdigit():
+                state = True
+    return (groups, state)
+
+
+def sample_names(count, seed=0):
+    random.seed(seed)
+    parts = ["GEO-", "RIG-", "hero", "Arm", "_", ".", "-", "L", "Left", "001", "7", "ver", " "]
+    names = ["shot_010_ver_003", "_scene_source", "RIG-hero_main.001", "ab", "_a", "__a1"]
+    while len(names) < count:
+        names.append("".join(random.choice(parts) for _ in range(random.randint(2, 12))))
+    return names
+
+
+def main():
+    names = sample_names(20000)
+    # Same tokenization for every name the legacy version could handle
+    for name in names:
+        assert naming.seperate_string_number(name) == seperate_string_number_legacy(name), name
+
+    uncached = naming._tokenize.__wrapped__
+    runs = 5
+    results = {
+        "legacy": timeit.timeit(
+            lambda: [seperate_string_number_legacy(name) for name in names], number=runs
+        ),
+        "single pass": timeit.timeit(lambda: [uncached(name) for name in names], number=runs),
+        "single pass, cached": timeit.timeit(
+            lambda: [naming.seperate_string_number(name) for name in names], number=runs
+        ),
+    }
+    for label, seconds in results.items():
+        print(f"{label:>20}: {seconds / runs * 1000:8.2f} ms per {len(names)} names")
+
+    long_name = "a1_" * 2000
+    legacy = timeit.timeit(lambda: seperate_string_number_legacy(long_name), number=1)
+    single = timeit.timeit(lambda: uncached(long_name), number=1)
+    print(f"{len(long_name)} characters: legacy {legacy * 1000:.2f} ms, single pass {single * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
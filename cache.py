@@ -0,0 +1,776 @@
+import bpy
+import os
+import queue
+import threading
+import time
+from bpy.app.handlers import persistent
+from collections import Counter
+from contextlib import contextmanager
+from typing import Tuple
+
+from .functions import (
+    scene_file_name,
+    naming_ussues,
+    data_owners,
+    version_index,
+    id_content_hash,
+    scene_fingerprint,
+    scenes_closures,
+    read_export_manifest,
+    ID_TYPE_COLLECTIONS,
+)
+from .naming import clear_rules_cache
+
+
+# Data-blocks checked by the Naming Issues panel, in the order they are shown
+NAMING_COLLECTIONS = (
+    "objects",
+    "meshes",
+    "images",
+    "materials",
+    "armatures",
+    "lattices",
+    "cameras",
+    "lights",
+)
+# Object Data named after their owner Objects
+OWNED_COLLECTIONS = ("meshes", "armatures", "lattices", "cameras", "lights")
+NAMING_ICONS = {
+    "objects": "OBJECT_DATAMODE",
+    "meshes": "MESH_DATA",
+    "images": "IMAGE_DATA",
+    "materials": "MATERIAL",
+    "armatures": "ARMATURE_DATA",
+    "lattices": "LATTICE_DATA",
+    "cameras": "CAMERA_DATA",
+    "lights": "LIGHT_DATA",
+}
+# RNA types whose renaming is reported through the msgbus
+NAMING_TYPES = {
+    "objects": bpy.types.Object,
+    "meshes": bpy.types.Mesh,
+    "images": bpy.types.Image,
+    "materials": bpy.types.Material,
+    "armatures": bpy.types.Armature,
+    "lattices": bpy.types.Lattice,
+    "cameras": bpy.types.Camera,
+    "lights": bpy.types.Light,
+}
+
+
+def tag_redraw():
+    for window in bpy.context.window_manager.windows:
+        for area in window.screen.areas:
+            if area.type == "VIEW_3D":
+                area.tag_redraw()
+
+
+class NamingIssuesIndex:
+    """Naming issues of the data-blocks kept between the redraws.
+    Only the blocks that were added, removed or renamed are validated again"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        # {collection: {session_uid: (name, fixed_name, repr)}}
+        self.entries = {attr: {} for attr in NAMING_COLLECTIONS}
+        self.counts = {attr: -1 for attr in NAMING_COLLECTIONS}
+        self.dirty = set(NAMING_COLLECTIONS)
+        # Data uid -> uid of its owner Object, as of the last Objects pass
+        self.owners = {}
+        # Data uids to validate again, kept until their collection is synced
+        self.stale_data = set()
+        self.asset_name = None
+        self._issues = None
+
+    def invalidate(self, attrs=None):
+        """Mark the collections to be checked for added, removed or renamed blocks"""
+        self.dirty.update(attrs or NAMING_COLLECTIONS)
+        self._issues = None
+
+    def sync(self, scene, attrs=NAMING_COLLECTIONS):
+        """Re-validate only the blocks that were added or renamed since the last sync"""
+        for _ in self.sync_steps(scene, attrs):
+            pass
+
+    def sync_steps(self, scene, attrs=NAMING_COLLECTIONS):
+        """sync() as a generator, yields after every block of the checked collections"""
+        if scene.ammopipe_naming_asset_name != self.asset_name:
+            self.clear()
+            self.asset_name = scene.ammopipe_naming_asset_name
+        # Data names depend on their Objects, so Objects always go first
+        stale_data = self.stale_data
+        owners = None
+        for attr in NAMING_COLLECTIONS:
+            if attr != "objects" and attr not in attrs:
+                continue
+            block_collection = getattr(bpy.data, attr)
+            if attr not in self.dirty and len(block_collection) == self.counts[attr]:
+                if stale_data.isdisjoint(self.entries[attr]):
+                    continue
+            entries = self.entries[attr]
+            entries_new = {}
+            for block in block_collection:
+                uid = block.session_uid
+                entry = entries.get(uid)
+                if entry is None or entry[0] != block.name or uid in stale_data:
+                    if owners is None and attr in OWNED_COLLECTIONS:
+                        # One Data -> Object map for the whole pass
+                        owners = data_owners()
+                    entry = (
+                        block.name,
+                        naming_ussues(scene, block, block_collection, owners),
+                        repr(block),
+                    )
+                    if attr == "objects" and block.data is not None:
+                        # Object was added or renamed, its Data name has to follow
+                        stale_data.add(block.data.session_uid)
+                entries_new[uid] = entry
+                yield
+            if attr == "objects":
+                # Data swapped, Objects removed or added: the expected name
+                # of the Data changes with its owner, the old and the new Data alike
+                owners = data_owners()
+                owner_uids = {data.session_uid: ob.session_uid for data, ob in owners.items()}
+                stale_data.update(
+                    uid
+                    for uid in owner_uids.keys() | self.owners.keys()
+                    if owner_uids.get(uid) != self.owners.get(uid)
+                )
+                self.owners = owner_uids
+            else:
+                stale_data.difference_update(entries_new)
+            self.entries[attr] = entries_new
+            self.counts[attr] = len(block_collection)
+            self.dirty.discard(attr)
+            self._issues = None
+
+    def issues(self, scene, attrs=NAMING_COLLECTIONS):
+        """List (collection, block repr, name, fixed name) for every misnamed block"""
+        self.sync(scene, attrs)
+        if self._issues is None:
+            self._issues = [
+                (attr, entry[2], entry[0], entry[1])
+                for attr in NAMING_COLLECTIONS
+                for entry in sorted(self.entries[attr].values())
+                if entry[0] != entry[1]
+            ]
+        return [issue for issue in self._issues if issue[0] in attrs]
+
+
+naming_index = NamingIssuesIndex()
+
+
+class FingerprintCache:
+    """Content hashes of the IDs by session_uid, the Scenes closures and their fingerprints.
+    The hashes of the IDs reported by the depsgraph are dropped, renames drop all of them.
+    The closures are collected again only when the relations or the blocks count change.
+    The fingerprints are recomputed by a timer once the changes settle, never in draw()"""
+
+    # Seconds without changes before the fingerprints are recomputed
+    delay = 0.5
+
+    def __init__(self):
+        # Timers are told apart by the function object, a bound method is a new one every time
+        self.timer = self.refresh
+        self.clear()
+
+    def clear(self):
+        self.hashes = {}
+        self.closures = None
+        self.counts = None
+        self.scenes = None
+        self.dirty = True
+
+    def invalidate(self, uids=None, relations=False):
+        """Drop the hashes of the IDs by session_uid, or all of them.
+        relations: the Scenes closures have to be collected again"""
+        if uids is None:
+            self.hashes.clear()
+        else:
+            for uid in uids:
+                self.hashes.pop(uid, None)
+        if relations:
+            self.closures = None
+        self.dirty = True
+        if self.scenes is not None:
+            self.schedule(self.delay)
+
+    def schedule(self, delay):
+        # Every change postpones the recomputing
+        if bpy.app.timers.is_registered(self.timer):
+            bpy.app.timers.unregister(self.timer)
+        bpy.app.timers.register(self.timer, first_interval=delay)
+
+    def content_hash(self, block) -> str:
+        uid = block.session_uid
+        content_hash = self.hashes.get(uid)
+        if content_hash is None:
+            content_hash = self.hashes[uid] = id_content_hash(block)
+        return content_hash
+
+    def refresh(self):
+        """Recompute the fingerprints, the closures only when they are out of date"""
+        if bpy.app.timers.is_registered(self.timer):
+            bpy.app.timers.unregister(self.timer)
+        counts = tuple(len(getattr(bpy.data, attr)) for attr in ID_TYPE_COLLECTIONS.values())
+        if self.closures is None or counts != self.counts:
+            self.closures = list(scenes_closures(bpy.data.scenes).items())
+            self.counts = counts
+        try:
+            self.scenes = {
+                scene.name: scene_fingerprint(blocks, self.content_hash)
+                for scene, blocks in self.closures
+            }
+        except ReferenceError:
+            # Some block of the closures was removed meanwhile
+            self.closures = None
+            return self.refresh()
+        self.dirty = False
+        tag_redraw()
+        return None
+
+    def fingerprints(self):
+        """Scene name -> fingerprint of its closure, for all the Scenes.
+        Recomputed right away when out of date, e.g. before exporting"""
+        if self.dirty or self.scenes is None:
+            self.refresh()
+        return self.scenes
+
+    def cached(self):
+        """The last fingerprints for the panels, empty until the first are computed.
+        Recomputing is only scheduled, out of date ones are replaced a moment later"""
+        if self.dirty and not bpy.app.timers.is_registered(self.timer):
+            self.schedule(0.0 if self.scenes is None else self.delay)
+        return self.scenes or NO_FINGERPRINTS
+
+
+# Shared by the panels until the first fingerprints, so it stays the same object
+NO_FINGERPRINTS = {}
+fingerprint_cache = FingerprintCache()
+
+
+class WorkflowCache:
+    """Workflows of all the Scenes, resolved once per change for the panels"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.workflows = None
+        self.count = -1
+
+    def invalidate(self):
+        self.workflows = None
+
+    def get(self) -> frozenset:
+        # Added and removed Scenes change the count
+        if self.workflows is None or len(bpy.data.scenes) != self.count:
+            self.workflows = frozenset(scene.ammopipe_workflow for scene in bpy.data.scenes)
+            self.count = len(bpy.data.scenes)
+        return self.workflows
+
+
+workflow_cache = WorkflowCache()
+
+
+def workflows() -> frozenset:
+    """Workflows used by any of the Scenes"""
+    return workflow_cache.get()
+
+
+class PanelRows:
+    """Rows of the Scenes panels, built once per change so that draw() only renders them.
+    The rows hold names, never the blocks themselves"""
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.rows = {}
+        self.count = -1
+
+    def _check_scenes(self):
+        # Added and removed Scenes
+        if len(bpy.data.scenes) != self.count:
+            self.rows.clear()
+            self.count = len(bpy.data.scenes)
+
+    def invalidate(self, *keys):
+        if not keys:
+            self.rows.clear()
+        for key in keys:
+            self.rows.pop(key, None)
+
+    def _get(self, key, build):
+        self._check_scenes()
+        rows = self.rows.get(key)
+        if rows is None:
+            rows = self.rows[key] = build()
+        return rows
+
+    def source_collections(self) -> Tuple:
+        """Source Scene name and names of its top Collections, (None, ()) without the Source"""
+
+        def build():
+            for scene in bpy.data.scenes:
+                if scene.ammopipe_source_scene:
+                    return (
+                        scene.name,
+                        tuple(
+                            coll.name
+                            for coll in scene.collection.children
+                            if not coll.override_library
+                        ),
+                    )
+            return (None, ())
+
+        return self._get("collections", build)
+
+    def shared_collections(self, scene) -> Tuple:
+        """Names of the Scene's top Collections that are shared ("Link")"""
+
+        def build():
+            return tuple(
+                coll.name
+                for coll in scene.collection.children
+                if coll.ammopipe_collection_share_enum == "Link"
+            )
+
+        return self._get(("localize", scene.name), build)
+
+    def saved_scenes(self, exports, fingerprints) -> Tuple:
+        """(Scene name, button text, icon) of the Scenes to save separately,
+        exports and fingerprints are those of directory_scanner and fingerprint_cache"""
+
+        def build():
+            rows = []
+            for scene in bpy.data.scenes:
+                if scene.ammopipe_source_scene:
+                    continue
+                file_name = scene_file_name(scene.name)
+                # Unknown until the fingerprints are computed the first time
+                if file_name not in exports or scene.name not in fingerprints:
+                    rows.append((scene.name, "Save Scene", "FILE_BLEND"))
+                elif exports[file_name] == fingerprints.get(scene.name):
+                    rows.append((scene.name, "Up to date", "CHECKMARK"))
+                else:
+                    rows.append((scene.name, "Stale", "FILE_REFRESH"))
+            return tuple(rows)
+
+        self._check_scenes()
+        cached = self.rows.get("save")
+        # Both dicts are replaced whenever they change
+        if (
+            cached is None
+            or cached[0] is not exports
+            or cached[1] is not fingerprints
+            or cached[2] != bpy.data.filepath
+        ):
+            cached = self.rows["save"] = (exports, fingerprints, bpy.data.filepath, build())
+        return cached[3]
+
+
+panel_rows = PanelRows()
+
+
+# Shared by the directories not scanned yet, so it stays the same object
+NO_EXPORTS = {}
+
+
+class DirectoryScanner:
+    """Version indices of the watched directories, refreshed by a background thread.
+    The panels read the cached results and never touch the filesystem in draw()"""
+
+    # Seconds between checking the directories mtime
+    interval = 2.0
+
+    def __init__(self):
+        self.indices = {}
+        self.exports = {}
+        self.watched = set()
+        self.forced = set()
+        self.results = queue.Queue()
+        self.wakeup = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+        # Timers are told apart by the function object, a bound method is a new one every time
+        self.timer = self.poll
+
+    def get(self, directory):
+        """Cached index of the directory, None until its first scan is finished"""
+        if directory not in self.watched:
+            with self.lock:
+                self.watched.add(directory)
+            self.wakeup.set()
+        return self.indices.get(directory)
+
+    def get_exports(self, directory):
+        """Cached export manifest of the directory, empty until its first scan"""
+        self.get(directory)
+        return self.exports.get(directory, NO_EXPORTS)
+
+    def refresh(self, directory):
+        """Rescan the directory right away, e.g. after saving a file into it"""
+        with self.lock:
+            self.watched.add(directory)
+            self.forced.add(directory)
+        self.wakeup.set()
+
+    def _scan(self):
+        mtimes = {}
+        while self.thread is threading.current_thread():
+            with self.lock:
+                watched = list(self.watched)
+                forced = self.forced.copy()
+                self.forced.clear()
+            for directory in watched:
+                try:
+                    mtime = os.stat(directory).st_mtime_ns
+                    if mtimes.get(directory) == mtime and directory not in forced:
+                        continue
+                    index = version_index(directory)
+                    exports = read_export_manifest(directory)
+                    # Writing the manifest may touch the directory
+                    mtimes[directory] = index.mtime
+                except OSError:
+                    mtimes.pop(directory, None)
+                    index = None
+                    exports = {}
+                self.results.put((directory, index, exports))
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+
+    def poll(self):
+        """Timer on the main thread picking up the finished scans"""
+        changed = False
+        while True:
+            try:
+                directory, index, exports = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if self.indices.get(directory) is not index:
+                self.indices[directory] = index
+                changed = True
+            if self.exports.get(directory) != exports:
+                self.exports[directory] = exports
+                changed = True
+        if changed:
+            tag_redraw()
+        return 0.25
+
+    def start(self):
+        self.thread = threading.Thread(target=self._scan, name="AmmoPipe Scanner", daemon=True)
+        self.thread.start()
+        if not bpy.app.timers.is_registered(self.timer):
+            bpy.app.timers.register(self.timer, persistent=True)
+
+    def stop(self):
+        if bpy.app.timers.is_registered(self.timer):
+            bpy.app.timers.unregister(self.timer)
+        self.thread = None
+        self.wakeup.set()
+        self.indices.clear()
+        self.exports.clear()
+
+
+directory_scanner = DirectoryScanner()
+
+
+class InvalidationBatch:
+    """Cache invalidations of a mass change of the data-blocks, see invalidation_batch().
+    Meanwhile the msgbus callbacks and handlers of the add-on caches only count
+    their events and collect what they would invalidate, the caches are invalidated
+    once at the end. Blender itself still updates the depsgraph and publishes
+    the msgbus as usual, only the reactions of the add-on are batched.
+    Blender publishes the msgbus and runs the depsgraph handlers after
+    the operator is done, so the batch is closed on the next timer tick"""
+
+    def __init__(self):
+        self.depth = 0
+        self.closing = False
+        self.name = ""
+        self.started = 0.0
+        self.suppressed = Counter()
+        self.naming_attrs = set()
+        self.updated = set()
+        self.relations = False
+        self.fingerprints = False
+        self.workflows = False
+        self.panels = False
+        self.timer = self.close
+
+    @property
+    def active(self) -> bool:
+        return self.depth > 0 or self.closing
+
+    def suppress(self, event) -> bool:
+        """Count the event and return True while the batch lasts"""
+        if not self.active:
+            return False
+        self.suppressed[event] += 1
+        return True
+
+    def enter(self, name):
+        if self.depth == 0:
+            if self.closing:
+                # The previous batch is still waiting for its tick
+                self.close()
+            self.name = name
+            self.started = time.perf_counter()
+            print("AmmoPipe invalidation batch:", name)
+        self.depth += 1
+
+    def exit(self):
+        self.depth -= 1
+        if self.depth:
+            return
+        print(f"AmmoPipe invalidation batch: {self.name} changed in {time.perf_counter() - self.started:.3f} s")
+        if bpy.app.background:
+            # No event loop, nothing is published later
+            self.close()
+        else:
+            self.closing = True
+            bpy.app.timers.register(self.timer, first_interval=0.0)
+
+    def close(self):
+        """Invalidate the caches once for all the suppressed events"""
+        if bpy.app.timers.is_registered(self.timer):
+            bpy.app.timers.unregister(self.timer)
+        self.closing = False
+        start = time.perf_counter()
+        check_naming_counts()
+        if self.naming_attrs:
+            naming_index.invalidate(self.naming_attrs)
+        if self.fingerprints:
+            fingerprint_cache.invalidate()
+        elif self.updated or self.relations:
+            fingerprint_cache.invalidate(self.updated, self.relations)
+        if self.workflows:
+            workflow_cache.invalidate()
+        if self.panels:
+            panel_rows.invalidate()
+        tag_redraw()
+        print(
+            f"AmmoPipe invalidation batch: {self.name} updated in {time.perf_counter() - start:.3f} s,",
+            "suppressed:",
+            ", ".join(f"{count} {event}" for event, count in sorted(self.suppressed.items()))
+            or "nothing",
+        )
+        self.clear()
+
+    def clear(self):
+        self.depth = 0
+        self.closing = False
+        self.suppressed.clear()
+        self.naming_attrs.clear()
+        self.updated.clear()
+        self.relations = False
+        self.fingerprints = False
+        self.workflows = False
+        self.panels = False
+
+
+invalidations = InvalidationBatch()
+
+
+@contextmanager
+def invalidation_batch(name):
+    """Wrap the mutation phase of a heavy operator:
+
+        with invalidation_batch("Organize Scene"):
+            plan.apply()
+
+    The nested batches are merged into the outermost one"""
+    invalidations.enter(name)
+    try:
+        yield invalidations
+    finally:
+        invalidations.exit()
+
+
+def check_naming_counts():
+    # Added and removed blocks change the length of their collection
+    for attr in NAMING_COLLECTIONS:
+        if len(getattr(bpy.data, attr)) != naming_index.counts[attr]:
+            naming_index.invalidate((attr,))
+
+
+def naming_index_changed(*attrs):
+    if invalidations.suppress("naming"):
+        invalidations.naming_attrs.update(attrs)
+        return
+    naming_index.invalidate(attrs)
+
+
+def fingerprints_changed():
+    if invalidations.suppress("fingerprints"):
+        invalidations.fingerprints = True
+        return
+    fingerprint_cache.invalidate()
+
+
+def workflows_changed():
+    if invalidations.suppress("workflows"):
+        invalidations.workflows = True
+        return
+    workflow_cache.invalidate()
+
+
+def panel_rows_changed():
+    if invalidations.suppress("panels"):
+        invalidations.panels = True
+        return
+    panel_rows.invalidate()
+
+
+def subscribe_msgbus():
+    for attr, rna_type in NAMING_TYPES.items():
+        bpy.msgbus.subscribe_rna(
+            key=(rna_type, "name"),
+            owner=naming_index,
+            args=(attr,),
+            notify=naming_index_changed,
+        )
+    # Swapping the Object Data changes the expected Data names,
+    # the Objects pass finds the old and the new Data by their owners
+    bpy.msgbus.subscribe_rna(
+        key=(bpy.types.Object, "data"),
+        owner=naming_index,
+        args=("objects",),
+        notify=naming_index_changed,
+    )
+    bpy.msgbus.subscribe_rna(
+        key=(bpy.types.Scene, "ammopipe_workflow"),
+        owner=workflow_cache,
+        args=(),
+        notify=workflows_changed,
+    )
+    # Everything the Scenes panels rows are made of
+    panel_keys = (
+        (bpy.types.Scene, "name"),
+        (bpy.types.Scene, "ammopipe_source_scene"),
+        (bpy.types.Collection, "name"),
+        (bpy.types.Collection, "ammopipe_collection_share_enum"),
+        (bpy.types.Collection, "override_library"),
+    )
+    for key in panel_keys:
+        bpy.msgbus.subscribe_rna(
+            key=key,
+            owner=panel_rows,
+            args=(),
+            notify=panel_rows_changed,
+        )
+    # The names are part of the exported Scenes fingerprints
+    fingerprint_types = (
+        *NAMING_TYPES.values(),
+        bpy.types.Collection,
+        bpy.types.Scene,
+        bpy.types.Action,
+    )
+    for rna_type in fingerprint_types:
+        bpy.msgbus.subscribe_rna(
+            key=(rna_type, "name"),
+            owner=fingerprint_cache,
+            args=(),
+            notify=fingerprints_changed,
+        )
+
+
+def is_animation_playing() -> bool:
+    return any(window.screen.is_animation_playing for window in bpy.context.window_manager.windows)
+
+
+@persistent
+def cache_depsgraph_update(scene, depsgraph):
+    # Collections relinked, added or removed
+    panels = depsgraph.id_type_updated("COLLECTION") or depsgraph.id_type_updated("SCENE")
+    if is_animation_playing():
+        # Nothing but the animated values changes, they aren't fingerprinted
+        updated = set()
+        relations = False
+    else:
+        updated = set()
+        relations = depsgraph.id_type_updated("COLLECTION")
+        for update in depsgraph.updates:
+            updated.add(update.id.original.session_uid)
+            # Objects whose pointers changed, not their transform, geometry or materials
+            if (
+                not relations
+                and isinstance(update.id, bpy.types.Object)
+                and not (
+                    update.is_updated_transform
+                    or update.is_updated_geometry
+                    or update.is_updated_shading
+                )
+            ):
+                relations = True
+    if invalidations.suppress("depsgraph"):
+        invalidations.panels = invalidations.panels or panels
+        invalidations.updated.update(updated)
+        invalidations.relations = invalidations.relations or relations
+        return
+    check_naming_counts()
+    if panels:
+        panel_rows.invalidate()
+    if updated or relations:
+        fingerprint_cache.invalidate(updated, relations)
+
+
+@persistent
+def cache_reset(dummy):
+    invalidations.clear()
+    naming_index.clear()
+    panel_rows.clear()
+    workflow_cache.clear()
+    fingerprint_cache.clear()
+
+
+@persistent
+def cache_load_post(dummy):
+    # Another file may belong to another project
+    clear_rules_cache()
+    invalidations.clear()
+    naming_index.clear()
+    panel_rows.clear()
+    workflow_cache.clear()
+    fingerprint_cache.clear()
+    # The msgbus subscriptions are dropped with the old file
+    subscribe_msgbus()
+
+
+handlers = (
+    (bpy.app.handlers.depsgraph_update_post, cache_depsgraph_update),
+    (bpy.app.handlers.undo_post, cache_reset),
+    (bpy.app.handlers.redo_post, cache_reset),
+    (bpy.app.handlers.load_post, cache_load_post),
+)
+
+
+def register():
+    for handler_list, handler in handlers:
+        if handler not in handler_list:
+            handler_list.append(handler)
+    subscribe_msgbus()
+    directory_scanner.start()
+
+
+def unregister():
+    directory_scanner.stop()
+    if bpy.app.timers.is_registered(invalidations.timer):
+        bpy.app.timers.unregister(invalidations.timer)
+    invalidations.clear()
+    if bpy.app.timers.is_registered(fingerprint_cache.timer):
+        bpy.app.timers.unregister(fingerprint_cache.timer)
+    bpy.msgbus.clear_by_owner(naming_index)
+    bpy.msgbus.clear_by_owner(fingerprint_cache)
+    bpy.msgbus.clear_by_owner(workflow_cache)
+    bpy.msgbus.clear_by_owner(panel_rows)
+    for handler_list, handler in handlers:
+        if handler in handler_list:
+            handler_list.remove(handler)
+    naming_index.clear()
+    fingerprint_cache.clear()
+    workflow_cache.clear()
+    panel_rows.clear()
@@ -1,330 +1,977 @@
+from collections import Counter
 from contextvars import Context
-from typing import Dict, Tuple
+from typing import Dict, List, Tuple
+import array
 import bpy
+import bisect
+import csv
+import hashlib
+import json
 import os
+import re
+import threading
+import time
 
+from .naming import seperate_string_number, load_rules, plan_renames
+from .journal import journal, MISSING
 
-def recurLayerCollection(layerColl, collName):
-    """Recursively transverse layer_collection for a particular name"""
-    found = None
-    if layerColl.name == collName:
-        return layerColl
-    for layer in layerColl.children:
-        found = recurLayerCollection(layer, collName)
-        if found:
-            return found
 
+# Layer Collection flags kept through the reorganization
+LAYER_COLLECTION_STATE = ("exclude", "hide_viewport", "holdout", "indirect_only")
 
-def remove_collections(scene, coll, prefixes, asset_name):
-    """Remove all Scene Collections that don't pass the naming convention
-    and don't have any Objects"""
 
-    for collection in coll.children_recursive:
-        if not any(collection.name.startswith(prefix + asset_name) for prefix in prefixes):
-            if (
-                scene.ammopipe_remove_unused_collections
-                and len(collection.objects) == 0
-                and not "skip_delete" in collection.keys()
-            ):
-                print("DELETED collection", collection.name)
-                bpy.data.collections.remove(collection)
-
-
-def create_collections(scene, asset_name) -> Dict:
-    """Create Collections according to selected Asset's contents"""
-    # Mandatory minimun of Collections
-    coll_prefixes = ["COLL-", "GEO-"]
-    # List of Collections to create
-    if scene.ammopipe_naming_use_rigs:
-        coll_prefixes.append("RIG-")
-    if scene.ammopipe_naming_use_lights:
-        coll_prefixes.append("LIGHT-")
-    if scene.ammopipe_naming_use_cameras:
-        coll_prefixes.append("CAM-")
-    if scene.ammopipe_naming_use_refs:
-        coll_prefixes.append("REF-")
-
-    coll_dict = {}
-    children_all = [coll.name for coll in scene.collection.children_recursive]
-
-    # Create Collections from the Prefix List, link them to the Scene Collection
-    for prefix in coll_prefixes:
-        name = prefix + asset_name
-        if (name not in children_all) and not bpy.data.collections.get(name):
-            coll_new = bpy.data.collections.new(name)
-        else:
-            coll_new = bpy.data.collections.get(name)
-        if not scene.collection.children.get(name):
-            scene.collection.children.link(coll_new)
-        coll_dict[prefix] = coll_new
-        for coll in scene.collection.children_recursive:
-            if coll_new.name in coll.children:
-                coll.children.unlink(coll_new)
-
-    # Link GEO- and RIG- to the COLL- Collection
-    coll_dict["COLL-"].color_tag = "COLOR_05"
-    coll_dict["COLL-"].children.link(coll_dict["GEO-"])
-    coll_dict["GEO-"].color_tag = "COLOR_03"
-    scene.collection.children.unlink(coll_dict["GEO-"])
-    if scene.ammopipe_naming_use_rigs:
-        coll_dict["COLL-"].children.link(coll_dict["RIG-"])
-        coll_dict["RIG-"].color_tag = "COLOR_01"
-        scene.collection.children.unlink(coll_dict["RIG-"])
-
-    # Silly hack to place CAM-, LIGHT- & REF- below the COLL- in the Outliner list
-    add_colls_usage = {
-        "CAM-": scene.ammopipe_naming_link_cameras,
-        "LIGHT-": scene.ammopipe_naming_link_lights,
-        "REF-": scene.ammopipe_naming_link_refs,
-    }
-    for pref in add_colls_usage.keys():
-        if add_colls_usage[pref]:
-            if coll_dict[pref].name in scene.collection.children:
-                scene.collection.children.unlink(coll_dict[pref])
-            if add_colls_usage[pref] and not coll_dict[pref].name in coll_dict["COLL-"].children:
-                coll_dict["COLL-"].children.link(coll_dict[pref])
-            else:
-                scene.collection.children.link(coll_dict[pref])
-
-    # List of objects types to associate with Collections
-    objects_types = {
-        "OTHERS": coll_dict["GEO-"],
-    }
-
-    if scene.ammopipe_naming_use_rigs:
-        objects_types["ARMATURE"] = coll_dict["RIG-"]
-    if scene.ammopipe_naming_use_lights:
-        objects_types["LIGHT"] = coll_dict["LIGHT-"]
-    if scene.ammopipe_naming_use_cameras:
-        objects_types["CAMERA"] = coll_dict["CAM-"]
-        objects_types["SPEAKER"] = coll_dict["CAM-"]
-    if scene.ammopipe_naming_use_refs:
-        objects_types["EMPTY"] = coll_dict["REF-"]
-
-    collections_all = list(scene.collection.children_recursive)
-    collections_all.append(scene.collection)
-
-    # Additional Sub-Collections for GEO- & RIG-
-    main_colls = [objects_types["OTHERS"]]
-    if scene.ammopipe_naming_use_rigs:
-        main_colls.append(objects_types["ARMATURE"])
-    add_colls = ["_main", "_helpers"]
-
-    for main_coll in main_colls:
-        for add_coll in add_colls:
-            find_coll = None
-            for coll in collections_all:
-                if (main_coll.name + add_coll) == coll.name:
-                    find_coll = coll
-            if not find_coll:
-                find_coll = bpy.data.collections.new(main_coll.name + add_coll)
-            for c in collections_all:
-                if find_coll.name in c.children:
-                    c.children.unlink(find_coll)
-            if not find_coll.name in main_coll.children:
-                main_coll.children.link(find_coll)
-            find_coll.color_tag = main_coll.color_tag
-
-    geo_add = [c for c in objects_types["OTHERS"].children if "_helpers" in c.name][0]
-    geo_main = [c for c in objects_types["OTHERS"].children if "_main" in c.name][0]
-    rig_add = None
-    rig_main = None
-    if scene.ammopipe_naming_use_rigs:
-        rig_add = [c for c in objects_types["ARMATURE"].children if "_helpers" in c.name][0]
-        rig_add.hide_viewport = False
-        rig_add.hide_render = False
-        rig_main = [c for c in objects_types["ARMATURE"].children if "_main" in c.name][0]
-
-    scene_dict = {
-        "objects_types": objects_types,
-        "geo_add": geo_add,
-        "geo_main": geo_main,
-        "rig_add": rig_add,
-        "rig_main": rig_main,
-        "coll_prefixes": coll_prefixes,
-    }
-    return scene_dict
-
-
-def organize_blocks(scene, asset_name):
-    """Create Collections and Objects with proper naming,
-    put Objects into relevant Collections based on the Object type"""
+def layer_collections_index(view_layer) -> Dict:
+    """Map every Collection to its Layer Collections in the View Layer,
+    in one pass over the tree, parents before children"""
+    index = {}
+    stack = [view_layer.layer_collection]
+    while stack:
+        layer_coll = stack.pop()
+        index.setdefault(layer_coll.collection, []).append(layer_coll)
+        stack.extend(reversed(layer_coll.children))
+    return index
 
-    # Place Objects into correct Collections
-    collections_all = list(scene.collection.children_recursive)
-    collections_all.append(scene.collection)
-    scene_dict = create_collections(scene, asset_name)
-    objects_types = scene_dict["objects_types"]
-    geo_add = scene_dict["geo_add"]
-    geo_main = scene_dict["geo_main"]
-    rig_add = scene_dict["rig_add"]
-    rig_main = scene_dict["rig_main"]
-    coll_prefixes = scene_dict["coll_prefixes"]
-
-    # If Keep Collections is on
-    if scene.ammopipe_naming_keep_geo_collections:
-        exclude_list = []
-        for coll in collections_all:
-            if coll is scene.collection or "WGTS" in coll.name:
+
+def capture_view_layers_state(scene) -> Dict:
+    """Layer Collections flags and Objects visibility of all the View Layers"""
+    state = {}
+    for view_layer in scene.view_layers:
+        colls = {}
+        for coll, layer_colls in layer_collections_index(view_layer).items():
+            colls[coll] = tuple(getattr(layer_colls[0], attr) for attr in LAYER_COLLECTION_STATE)
+        objects = {ob: ob.hide_get(view_layer=view_layer) for ob in scene.objects}
+        state[view_layer.name] = (colls, objects)
+    return state
+
+
+def restore_view_layers_state(scene, state):
+    """Bring back the state from capture_view_layers_state(),
+    also for the Collections that got new parents or names since"""
+    for view_layer in scene.view_layers:
+        if view_layer.name not in state:
+            continue
+        colls, objects = state[view_layer.name]
+        for coll, layer_colls in layer_collections_index(view_layer).items():
+            values = colls.get(coll)
+            if values is None:
                 continue
-            for ob in coll.objects:
-                if ob.type == "MESH":
-                    if coll.name not in scene_dict["objects_types"]["OTHERS"].children_recursive:
-                        # Link to GEO- collection
-                        if coll.name not in scene_dict["objects_types"]["OTHERS"].children:
-                            scene_dict["objects_types"]["OTHERS"].children.link(coll)
-                        coll.color_tag = scene_dict["objects_types"]["OTHERS"].color_tag
-                        if not coll.name.startswith(scene_dict["objects_types"]["OTHERS"].name):
-                            coll.name = scene_dict["objects_types"]["OTHERS"].name + "_" + coll.name
-                        exclude_list.append(coll.name)
-                    break
-        for coll in collections_all:
-            if (
-                coll is not scene_dict["objects_types"]["OTHERS"]
-                and coll.name not in scene_dict["objects_types"]["OTHERS"].children_recursive
-            ):
-                for child in coll.children:
-                    if child.name in exclude_list:
-                        coll.children.unlink(child)
+            for layer_coll in layer_colls:
+                for attr, value in zip(LAYER_COLLECTION_STATE, values):
+                    if getattr(layer_coll, attr) != value:
+                        setattr(layer_coll, attr, value)
+        # Objects visibility is reset when they are relinked
+        for ob in scene.objects:
+            hidden = objects.get(ob)
+            if hidden is not None and ob.hide_get(view_layer=view_layer) != hidden:
+                try:
+                    ob.hide_set(hidden, view_layer=view_layer)
+                except RuntimeError:
+                    # Not in the View Layer, e.g. its Collection is excluded
+                    pass
+
+
+# Removed IDs per type since the add-on was loaded, for debugging the cleanups
+removed_ids_counter = Counter()
+
+
+def batch_remove_ids(blocks) -> Dict:
+    """Remove the IDs with a single bpy.data.batch_remove() call,
+    so Blender walks the ID relations once instead of once per ID.
+    Return the number of removed IDs per type"""
+    blocks = set(blocks)
+    if not blocks:
+        return {}
+    counts = Counter(type(block).__name__ for block in blocks)
+    bpy.data.batch_remove(blocks)
+    removed_ids_counter.update(counts)
+    print("REMOVED", ", ".join(f"{count} {id_type}" for id_type, count in sorted(counts.items())))
+    return dict(counts)
+
+
+def run_steps(steps):
+    """Run a steps generator to the end, return what it returns"""
+    while True:
+        try:
+            next(steps)
+        except StopIteration as stop:
+            return stop.value
+
+
+class Progress:
+    """Count of the blocks processed by a long operation made of steps generators,
+    total is an estimate that may grow on the way"""
+
+    def __init__(self, total=0):
+        self.done = 0
+        self.total = total
+
+    @property
+    def fraction(self) -> float:
+        return min(self.done / self.total, 1.0) if self.total else 0.0
+
+    def track(self, steps):
+        """Run the steps generator counting its steps, yields self after every step.
+        Return what the generator returns"""
+        while True:
+            try:
+                next(steps)
+            except StopIteration as stop:
+                return stop.value
+            self.done += 1
+            yield self
+
+
+# ID types that are never removed together with a Scene
+KEEP_ID_TYPES = (
+    bpy.types.Library,
+    bpy.types.WindowManager,
+    bpy.types.Screen,
+    bpy.types.WorkSpace,
+    bpy.types.Scene,
+)
+
+
+def id_dependencies(user_map=None) -> Dict:
+    """Invert bpy.data.user_map(): every ID -> the IDs it uses"""
+    if user_map is None:
+        user_map = bpy.data.user_map()
+    dependencies = {block: set() for block in user_map}
+    for block, users in user_map.items():
+        for user in users:
+            dependencies.setdefault(user, set()).add(block)
+    return dependencies
+
+
+def reachable_ids(roots, dependencies, blocked=()) -> set:
+    """IDs used by the roots directly or through other IDs, the roots included.
+    The walk doesn't go through the blocked IDs"""
+    reached = set(roots)
+    stack = list(reached)
+    while stack:
+        for block in dependencies.get(stack.pop(), ()):
+            if block not in reached and block not in blocked:
+                reached.add(block)
+                stack.append(block)
+    return reached
+
+
+def scene_exclusive_ids(scene) -> set:
+    """The Scene and the IDs nothing else in the file needs:
+    IDs reached from the Scene but not from any other ID outside of it,
+    with fake users and the KEEP_ID_TYPES counted as outside"""
+    user_map = bpy.data.user_map()
+    dependencies = id_dependencies(user_map)
+    reached = reachable_ids((scene,), dependencies)
+    roots = [
+        block
+        for block in dependencies
+        if block != scene
+        and (block not in reached or block.use_fake_user or isinstance(block, KEEP_ID_TYPES))
+    ]
+    kept = reachable_ids(roots, dependencies, blocked={scene})
+    return reached - kept
+
 
-    for coll in collections_all:
-        if "WGTS" in coll.name:
+# ID types that don't go into the exported Scene files, the Libraries
+# of the linked IDs are written by Blender itself
+EXPORT_SKIP_TYPES = (
+    bpy.types.Library,
+    bpy.types.WindowManager,
+    bpy.types.Screen,
+    bpy.types.WorkSpace,
+)
+
+
+def scenes_closures(scenes) -> Dict:
+    """Every Scene -> the IDs it needs, itself included.
+    The users map is read once for all the Scenes"""
+    dependencies = id_dependencies()
+    blocked = {block for block in dependencies if isinstance(block, EXPORT_SKIP_TYPES)}
+    return {scene: reachable_ids((scene,), dependencies, blocked) for scene in scenes}
+
+
+def scene_file_name(scene_name) -> str:
+    """File name of the separately saved Scene of the current file"""
+    name = bpy.path.basename(bpy.data.filepath)
+    return (name.split(".blend")[0] + "_" + scene_name + ".blend").replace(
+        "__", "_"
+    )  # reduce underscores just in case
+
+
+def export_directory(save_path) -> str:
+    """Absolute folder of the Scenes Save Path, with or without the trailing slash.
+    The panel, the export and its manifest all go through here to agree on it"""
+    return os.path.normpath(bpy.path.abspath(save_path))
+
+
+# RNA properties that don't describe the content of an ID
+FINGERPRINT_SKIP_PROPERTIES = {
+    "rna_type",
+    "name",
+    "name_full",
+    "session_uid",
+    "users",
+    "tag",
+    "is_evaluated",
+    "original",
+    "is_missing",
+    "is_runtime_data",
+    "is_embedded_data",
+    "is_library_indirect",
+    "preview",
+    # Playback, selection and UI state, not the content
+    "frame_current",
+    "frame_subframe",
+    "frame_float",
+    "frame_current_final",
+    "frame_preview_start",
+    "frame_preview_end",
+    "use_preview_range",
+    "mode",
+    "active_material_index",
+    "active_shape_key_index",
+    "is_dirty",
+    "bindcode",
+    "has_data",
+    # Image buffer, the Image goes by its file instead
+    "pixels",
+    "size",
+}
+FINGERPRINT_PROPERTY_TYPES = {"BOOLEAN", "INT", "FLOAT", "STRING", "ENUM", "POINTER"}
+
+
+def hash_floats(digest, struct_collection, attr, size):
+    values = array.array("f", [0.0]) * (len(struct_collection) * size)
+    struct_collection.foreach_get(attr, values)
+    digest.update(values.tobytes())
+
+
+def hash_array(digest, value, prop):
+    """Fixed size numeric array property, copied at once without Python objects"""
+    if prop.type == "BOOLEAN":
+        digest.update(repr(tuple(value)).encode())
+        return
+    values = array.array("f" if prop.type == "FLOAT" else "i", [0]) * prop.array_length
+    value.foreach_get(values)
+    digest.update(values.tobytes())
+
+
+def id_content_hash(block) -> str:
+    """Hash of the ID settings and data, without its name, the animated values
+    and the playback state. Used IDs are included by their names only"""
+    digest = hashlib.sha1(type(block).__name__.encode())
+    # Animated values follow the current frame, the Action has them all
+    animated = set()
+    animation_data = getattr(block, "animation_data", None)
+    if animation_data is not None:
+        if animation_data.action is not None:
+            animated.update(fcurve.data_path for fcurve in animation_data.action.fcurves)
+        animated.update(driver.data_path for driver in animation_data.drivers)
+    for prop in block.bl_rna.properties:
+        if prop.identifier in FINGERPRINT_SKIP_PROPERTIES or prop.type not in FINGERPRINT_PROPERTY_TYPES:
             continue
-        else:
+        if prop.identifier in animated:
+            continue
+        try:
+            value = getattr(block, prop.identifier)
+        except (AttributeError, RuntimeError):
+            continue
+        if prop.type == "POINTER":
+            if not isinstance(value, bpy.types.ID):
+                continue
+            value = value.name
+        elif getattr(prop, "is_array", False):
+            # Dynamic arrays can be as big as the data itself
+            if prop.array_length:
+                digest.update(prop.identifier.encode())
+                hash_array(digest, value, prop)
+            continue
+        digest.update((prop.identifier + repr(value)).encode())
+    if isinstance(block, bpy.types.Mesh):
+        hash_floats(digest, block.vertices, "co", 3)
+        digest.update(repr([len(block.edges), len(block.polygons)]).encode())
+        loops = array.array("i", [0]) * len(block.loops)
+        block.loops.foreach_get("vertex_index", loops)
+        digest.update(loops.tobytes())
+        digest.update(repr([material and material.name for material in block.materials]).encode())
+    elif isinstance(block, bpy.types.Action):
+        for fcurve in block.fcurves:
+            digest.update((fcurve.data_path + str(fcurve.array_index)).encode())
+            hash_floats(digest, fcurve.keyframe_points, "co", 2)
+    elif isinstance(block, bpy.types.Collection):
+        digest.update(repr(sorted(ob.name for ob in block.objects)).encode())
+        digest.update(repr(sorted(child.name for child in block.children)).encode())
+    elif isinstance(block, bpy.types.Object):
+        digest.update(repr([(modifier.name, modifier.type) for modifier in block.modifiers]).encode())
+    elif isinstance(block, bpy.types.Image):
+        # filepath and source are hashed above, the packed file stands for the pixels
+        if block.packed_file is not None:
+            digest.update(hashlib.sha1(block.packed_file.data).digest())
+    return digest.hexdigest()
+
+
+def scene_fingerprint(blocks, content_hash=id_content_hash) -> str:
+    """Fingerprint of the Scene closure: names and content of all its IDs"""
+    digest = hashlib.sha1()
+    for line in sorted(
+        type(block).__name__ + block.name + content_hash(block) for block in blocks
+    ):
+        digest.update(line.encode())
+    return digest.hexdigest()
+
+
+# Exported file name -> fingerprint of its Scene, kept in the export folder
+EXPORT_MANIFEST = ".ammopipe_exports.json"
+
+
+def read_export_manifest(directory) -> Dict:
+    try:
+        with open(os.path.join(directory, EXPORT_MANIFEST), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # Files deleted by hand are not up to date anymore
+    files = set(os.listdir(directory))
+    return {name: fingerprint for name, fingerprint in manifest.items() if name in files}
+
+
+def write_export_manifest(directory, manifest):
+    with open(os.path.join(directory, EXPORT_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+def plan_scene_exports(scenes, directory, fingerprints=None, force=False) -> List:
+    """(Scene, IDs to write, file name, fingerprint) for every Scene whose file
+    in the directory is missing or out of date, or for all of them if forced.
+    fingerprints (Scene name -> fingerprint) spare hashing the Scenes again"""
+    fingerprints = fingerprints or {}
+    manifest = read_export_manifest(bpy.path.abspath(directory))
+    exports = []
+    for scene, blocks in scenes_closures(scenes).items():
+        file_name = scene_file_name(scene.name)
+        fingerprint = fingerprints.get(scene.name) or scene_fingerprint(blocks)
+        if force or manifest.get(file_name) != fingerprint:
+            exports.append((scene, blocks, file_name, fingerprint))
+    return exports
+
+
+def update_export_manifest(directory, fingerprints):
+    """Store the fingerprints (file name -> fingerprint) of the written files"""
+    directory = bpy.path.abspath(directory)
+    manifest = read_export_manifest(directory)
+    manifest.update(fingerprints)
+    write_export_manifest(directory, manifest)
+
+
+def write_scenes(scenes, directory, fingerprints=None, force=False) -> Dict:
+    """Write every Scene with the IDs it needs into its own .blend in the directory,
+    the open file stays as it is. Scenes whose files are up to date are skipped
+    unless forced. Return Scene name -> file path of the written Scenes"""
+    directory = bpy.path.abspath(directory)
+    paths = {}
+    written = {}
+    for scene, blocks, file_name, fingerprint in plan_scene_exports(
+        scenes, directory, fingerprints, force
+    ):
+        filepath = os.path.join(directory, file_name)
+        bpy.data.libraries.write(filepath, blocks, path_remap="RELATIVE")
+        written[file_name] = fingerprint
+        paths[scene.name] = filepath
+    if written:
+        update_export_manifest(directory, written)
+    return paths
+
+
+def estimate_id_size(block) -> int:
+    """Rough amount of memory the ID takes, in bytes"""
+    if isinstance(block, bpy.types.Mesh):
+        return (
+            48 * len(block.vertices)
+            + 16 * len(block.edges)
+            + 24 * len(block.loops)
+            + 24 * len(block.polygons)
+        )
+    if isinstance(block, bpy.types.Image):
+        if not block.has_data:
+            return 0
+        return block.size[0] * block.size[1] * block.channels * (4 if block.is_float else 1)
+    if isinstance(block, bpy.types.Action):
+        return 64 * sum(len(fcurve.keyframe_points) for fcurve in block.fcurves)
+    return 1024
+
+
+def switch_windows_scene(scenes):
+    """Show another Scene in the windows showing the Scenes about to be removed"""
+    others = [other for other in bpy.data.scenes if other not in scenes]
+    if not others:
+        return
+    # There are no windows under "blender -b"
+    for window_manager in bpy.data.window_managers:
+        for window in window_manager.windows:
+            if window.scene in scenes:
+                window.scene = others[0]
+
+
+def delete_scene(scene) -> Dict:
+    """Delete the Scene with the data only it uses, in one batch.
+    Return ID type -> (removed count, estimated bytes freed)"""
+    doomed = scene_exclusive_ids(scene)
+    sizes = Counter()
+    for block in doomed:
+        sizes[type(block).__name__] += estimate_id_size(block)
+    switch_windows_scene((scene,))
+    counts = batch_remove_ids(doomed)
+    return {id_type: (count, sizes[id_type]) for id_type, count in counts.items()}
+
+
+def size_string(size) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class PlannedCollection:
+    """Collection that is created only when the plan is applied"""
+
+    def __init__(self, name):
+        self.name = name
+        self.collection = None
+
+
+class OrganizePlan:
+    """One-pass snapshot of the Scene's Collections graph and the minimal
+    list of actions bringing it to the organized state.
+    The Scene isn't touched until apply() is called"""
+
+    def __init__(self, scene, asset_name):
+        self.scene = scene
+        self.asset_name = asset_name
+        self.master = scene.collection
+        self.actions = []
+        # Simulated state of the snapshot
+        self.children = {}
+        self.parents = {}
+        self.objects = {}
+        self.users = {}
+        self.names = {}
+        self.props = {}
+        # Hierarchy of the snapshot, taken by plan_organize_steps()
+        self.initial = []
+
+    def __len__(self):
+        return len(self.actions)
+
+    def load(self, coll):
+        """Add the Collection with its sub-tree to the snapshot"""
+        run_steps(self.load_steps(coll))
+
+    def load_steps(self, coll):
+        """load() as a generator, yields after every Collection"""
+        stack = [coll]
+        while stack:
+            coll = stack.pop()
+            if coll in self.children:
+                continue
+            self.children[coll] = []
+            self.parents.setdefault(coll, [])
+            # Ordered set, Collections may hold thousands of Objects
+            self.objects[coll] = {}
+            if isinstance(coll, PlannedCollection):
+                continue
+            self.names[coll] = coll.name
             for ob in coll.objects:
-                if ob.type in objects_types.keys():
-                    if ob.type == "ARMATURE":
-                        if "META" in ob.name:
-                            continue
-                        else:
-                            if rig_main:
-                                if not ob.name in scene_dict["rig_main"].objects:
-                                    scene_dict["rig_main"].objects.link(ob)
-                                ob_coll_new = scene_dict["rig_main"]
-                            else:
-                                if not ob.name in scene.collection.objects:
-                                    scene.collection.objects.link(ob)
-                                ob_coll_new = scene.collection
-                    else:
-                        if ob.type == "EMPTY":  # Speical treatment for Empties
-                            if ob.empty_display_type == "IMAGE":
-                                if scene.ammopipe_naming_use_refs:
-                                    if ob.name not in objects_types[ob.type].objects:
-                                        objects_types[ob.type].objects.link(ob)
-                                        ob_coll_new = objects_types[ob.type]
-                                else:
-                                    if ob.name not in scene.collection.objects:
-                                        objects_types[ob.type].objects.link(ob)
-                                    ob_coll_new = scene.collection
-                            elif ob.instance_type == "COLLECTION":
-                                if scene.ammopipe_naming_use_refs:
-                                    if ob.name not in objects_types[ob.type].objects:
-                                        objects_types[ob.type].objects.link(ob)
-                                        ob_coll_new = objects_types[ob.type]
-                                else:
-                                    if ob.name not in geo_add.objects:
-                                        geo_add.objects.link(ob)
-                                    ob_coll_new = geo_add
-                            else:
-                                if ob.name not in geo_add.objects:
-                                    geo_add.objects.link(ob)
-                                ob_coll_new = geo_add
-                        if ob.name not in objects_types[ob.type].objects:
-                            objects_types[ob.type].objects.link(ob)
-                        ob_coll_new = objects_types[ob.type]
-                else:
-                    if ob.type == "LATTICE":
-                        if not ob.name in geo_add.objects:
-                            geo_add.objects.link(ob)
-                        ob_coll_new = geo_add
-                    elif ob.type == "MESH":
-                        if scene.ammopipe_naming_keep_geo_collections:
-                            keep_colls = [
-                                coll
-                                for coll in ob.users_collection
-                                if scene_dict["objects_types"]["OTHERS"].name in coll.name
-                            ]
-                            if len(keep_colls) > 0:
-                                ob_coll_new = keep_colls[0]
-                            else:
-                                if not ob.name in geo_main.objects:
-                                    geo_main.objects.link(ob)
-                                ob_coll_new = geo_main
-                        else:
-                            if not ob.name in geo_main.objects:
-                                geo_main.objects.link(ob)
-                            ob_coll_new = geo_main
-                    else:
-                        if not ob.name in scene_dict["objects_types"]["OTHERS"].objects:
-                            scene_dict["objects_types"]["OTHERS"].objects.link(ob)
-                        ob_coll_new = scene_dict["objects_types"]["OTHERS"]
-                if coll is not ob_coll_new:
-                    coll.objects.unlink(ob)
-
-    # Exception: WGTS Colletction
-    collections_all = scene.collection.children_recursive
-    collections_all_extended = collections_all
-    collections_all_extended.extend([scene.collection])
-    wgts = [coll for coll in collections_all_extended if "WGTS" in coll.name]
-    coll_widgets = False
-    if any(wgts):
-        coll_widgets_all = [
-            coll
-            for coll in collections_all_extended
-            if coll.name.startswith(asset_name + "_widgets")
-        ]
-        if len(coll_widgets_all) > 0:
-            coll_widgets = coll_widgets_all[0]
-        else:
-            coll_widgets = bpy.data.collections.new(asset_name + "_widgets")
+                self.objects[coll][ob] = None
+                self.users.setdefault(ob, []).append(coll)
+            for child in coll.children:
+                self.children[coll].append(child)
+                self.parents.setdefault(child, []).append(coll)
+                stack.append(child)
+            yield
+
+    def name(self, coll) -> str:
+        if isinstance(coll, PlannedCollection):
+            return coll.name
+        return self.names.get(coll, coll.name)
+
+    def hierarchy(self):
+        """Scene Collection followed by all its children, depth first"""
+        result = []
+        visited = set()
+        stack = [self.master]
+        while stack:
+            coll = stack.pop()
+            if coll in visited:
+                continue
+            visited.add(coll)
+            result.append(coll)
+            stack.extend(reversed(self.children[coll]))
+        return result
+
+    def find(self, name):
+        for coll in self.hierarchy():
+            if self.name(coll) == name:
+                return coll
+        return None
+
+    def is_inside(self, coll, ancestor) -> bool:
+        stack = list(self.parents.get(coll, ()))
+        visited = set()
+        while stack:
+            parent = stack.pop()
+            if parent == ancestor:
+                return True
+            if parent not in visited:
+                visited.add(parent)
+                stack.extend(self.parents.get(parent, ()))
+        return False
+
+    def object_collections(self, ob):
+        """Collections using the Object, including the ones of the other Scenes"""
+        colls = list(self.users.get(ob, ()))
+        colls += [coll for coll in ob.users_collection if coll not in self.children]
+        return colls
+
+    def get(self, coll, attr, default=None):
+        if (coll, attr) in self.props:
+            return self.props[(coll, attr)]
+        if isinstance(coll, PlannedCollection):
+            return default
+        return getattr(coll, attr)
+
+    # Actions, each one is recorded only when it changes something
+
+    def create(self, name):
+        coll = PlannedCollection(name)
+        self.load(coll)
+        self.actions.append(("create", coll))
+        return coll
+
+    def link_collection(self, parent, child):
+        self.load(child)
+        if child in self.children[parent]:
+            return
+        self.children[parent].append(child)
+        self.parents[child].append(parent)
+        self.actions.append(("link_collection", parent, child))
+
+    def unlink_collection(self, parent, child):
+        if child not in self.children.get(parent, ()):
+            return
+        self.children[parent].remove(child)
+        self.parents[child].remove(parent)
+        self.actions.append(("unlink_collection", parent, child))
+
+    def move_collection(self, child, parent):
+        """Make the Collection a child of the parent only"""
+        self.link_collection(parent, child)
+        for other in list(self.parents[child]):
+            if other != parent:
+                self.unlink_collection(other, child)
+
+    def link_object(self, coll, ob):
+        self.load(coll)
+        if ob in self.objects[coll]:
+            return
+        self.objects[coll][ob] = None
+        self.users.setdefault(ob, []).append(coll)
+        self.actions.append(("link_object", coll, ob))
+
+    def unlink_object(self, coll, ob):
+        if coll in self.children:
+            if ob not in self.objects[coll]:
+                return
+            del self.objects[coll][ob]
+            self.users[ob].remove(coll)
+        elif ob.name not in coll.objects:
+            return
+        self.actions.append(("unlink_object", coll, ob))
+
+    def set(self, block, attr, value):
+        if self.get(block, attr) == value:
+            return
+        self.props[(block, attr)] = value
+        self.actions.append(("set", block, attr, value))
+
+    def set_id_property(self, block, key, value):
+        if (block, "[" + key + "]") in self.props:
+            return
+        if not isinstance(block, PlannedCollection) and block.get(key) == value:
+            return
+        self.props[(block, "[" + key + "]")] = value
+        self.actions.append(("id_property", block, key, value))
+
+    def has_id_property(self, block, key) -> bool:
+        if (block, "[" + key + "]") in self.props:
+            return True
+        return not isinstance(block, PlannedCollection) and key in block.keys()
+
+    def rename(self, block, name):
+        if block in self.children:
+            if self.name(block) == name:
+                return
+            if isinstance(block, PlannedCollection):
+                block.name = name
+                return
+            self.names[block] = name
+        elif block.name == name:
+            return
+        self.actions.append(("rename", block, name))
+
+    def delete(self, coll):
+        for parent in list(self.parents[coll]):
+            self.children[parent].remove(coll)
+        for child in self.children[coll]:
+            self.parents[child].remove(coll)
+        for ob in self.objects[coll]:
+            self.users[ob].remove(coll)
+        self.parents[coll] = []
+        self.children[coll] = []
+        self.objects[coll] = {}
+        self.actions.append(("delete", coll))
+
+    # Planning, the same steps Organize Scene always did
+
+    def create_collections(self):
+        """Create Collections according to selected Asset's contents"""
+        scene = self.scene
+        asset_name = self.asset_name
+        # Mandatory minimun of Collections
+        coll_prefixes = ["COLL-", "GEO-"]
+        # List of Collections to create
+        if scene.ammopipe_naming_use_rigs:
+            coll_prefixes.append("RIG-")
+        if scene.ammopipe_naming_use_lights:
+            coll_prefixes.append("LIGHT-")
+        if scene.ammopipe_naming_use_cameras:
+            coll_prefixes.append("CAM-")
+        if scene.ammopipe_naming_use_refs:
+            coll_prefixes.append("REF-")
+        self.coll_prefixes = coll_prefixes
+
+        # GEO- & RIG- always go to the COLL- Collection, CAM-, LIGHT- & REF- if linkable
+        add_colls_usage = {
+            "GEO-": True,
+            "RIG-": True,
+            "CAM-": scene.ammopipe_naming_link_cameras,
+            "LIGHT-": scene.ammopipe_naming_link_lights,
+            "REF-": scene.ammopipe_naming_link_refs,
+        }
+        colors = {
+            "COLL-": "COLOR_05",
+            "GEO-": "COLOR_03",
+            "RIG-": "COLOR_01",
+        }
+
+        # Create Collections from the Prefix List and give each one its only parent
+        coll_dict = {}
+        for prefix in coll_prefixes:
+            name = prefix + asset_name
+            coll_new = self.find(name) or bpy.data.collections.get(name) or self.create(name)
+            if add_colls_usage.get(prefix):
+                self.move_collection(coll_new, coll_dict["COLL-"])
+            else:
+                self.move_collection(coll_new, self.master)
+            if prefix in colors:
+                self.set(coll_new, "color_tag", colors[prefix])
+            coll_dict[prefix] = coll_new
+
+        # List of objects types to associate with Collections
+        objects_types = {
+            "OTHERS": coll_dict["GEO-"],
+        }
+        if scene.ammopipe_naming_use_rigs:
+            objects_types["ARMATURE"] = coll_dict["RIG-"]
+        if scene.ammopipe_naming_use_lights:
+            objects_types["LIGHT"] = coll_dict["LIGHT-"]
+        if scene.ammopipe_naming_use_cameras:
+            objects_types["CAMERA"] = coll_dict["CAM-"]
+            objects_types["SPEAKER"] = coll_dict["CAM-"]
+        if scene.ammopipe_naming_use_refs:
+            objects_types["EMPTY"] = coll_dict["REF-"]
+        self.objects_types = objects_types
+
+        # Additional Sub-Collections for GEO- & RIG-
+        main_colls = [objects_types["OTHERS"]]
+        if scene.ammopipe_naming_use_rigs:
+            main_colls.append(objects_types["ARMATURE"])
+        sub_colls = {}
+        for main_coll in main_colls:
+            for add_coll in ["_main", "_helpers"]:
+                name = self.name(main_coll) + add_coll
+                find_coll = self.find(name) or self.create(name)
+                self.move_collection(find_coll, main_coll)
+                self.set(find_coll, "color_tag", self.get(main_coll, "color_tag", "NONE"))
+                sub_colls[(main_coll, add_coll)] = find_coll
+
+        self.geo_add = sub_colls[(objects_types["OTHERS"], "_helpers")]
+        self.geo_main = sub_colls[(objects_types["OTHERS"], "_main")]
+        self.rig_add = None
+        self.rig_main = None
+        if scene.ammopipe_naming_use_rigs:
+            self.rig_add = sub_colls[(objects_types["ARMATURE"], "_helpers")]
+            self.set(self.rig_add, "hide_viewport", False)
+            self.set(self.rig_add, "hide_render", False)
+            self.rig_main = sub_colls[(objects_types["ARMATURE"], "_main")]
+        self.structure = set(coll_dict.values()) | set(sub_colls.values())
+
+    def object_target(self, ob):
+        """Collection the Object belongs to, None if it stays where it is"""
+        scene = self.scene
+        objects_types = self.objects_types
+        geo = objects_types["OTHERS"]
+        if ob.type == "ARMATURE":
+            # META Armatures are handled separately
+            if "META" in ob.name:
+                return None
+            if "ARMATURE" in objects_types:
+                return self.rig_main
+        if ob.type in objects_types:
+            return objects_types[ob.type]
+        if ob.type == "LATTICE":
+            return self.geo_add
+        if ob.type == "MESH":
+            if scene.ammopipe_naming_keep_geo_collections:
+                keep_colls = sorted(
+                    (
+                        coll
+                        for coll in self.object_collections(ob)
+                        if self.name(geo) in self.name(coll)
+                    ),
+                    key=self.name,
+                )
+                if len(keep_colls) > 0:
+                    return keep_colls[0]
+            return self.geo_main
+        return geo
+
+    def organize_blocks(self):
+        """Put Objects into relevant Collections based on the Object type"""
+        run_steps(self.organize_blocks_steps())
+
+    def organize_blocks_steps(self):
+        """organize_blocks() as a generator, yields after every Collection and Object placed"""
+        scene = self.scene
+        asset_name = self.asset_name
+        geo = self.objects_types["OTHERS"]
+
+        # Exception: WGTS Colletction, goes first so that the Collections
+        # nested in WGTS are seen outside of the GEO- by Keep Collections
+        collections_all = self.hierarchy()
+        wgts = [coll for coll in collections_all if "WGTS" in self.name(coll)]
+        if any(wgts):
+            coll_widgets_all = [
+                coll
+                for coll in collections_all
+                if self.name(coll).startswith(asset_name + "_widgets")
+            ]
+            if len(coll_widgets_all) > 0:
+                coll_widgets = coll_widgets_all[0]
+            else:
+                coll_widgets = self.create(asset_name + "_widgets")
+            self.move_collection(coll_widgets, self.master)
+            self.set_id_property(coll_widgets, "skip_delete", 1)
+            for wgt in wgts:
+                self.move_collection(wgt, coll_widgets)
+
+        # If Keep Collections is on, Collections with meshes go into the GEO-
+        if scene.ammopipe_naming_keep_geo_collections:
+            for coll in self.initial[1:]:
+                if coll in self.structure or "WGTS" in self.name(coll):
+                    continue
+                if not any(ob.type == "MESH" for ob in self.objects[coll]):
+                    continue
+                if not self.is_inside(coll, geo):
+                    self.link_collection(geo, coll)
+                for parent in list(self.parents[coll]):
+                    if parent != geo and not self.is_inside(parent, geo):
+                        self.unlink_collection(parent, coll)
+                self.set(coll, "color_tag", self.get(geo, "color_tag", "NONE"))
+                if not self.name(coll).startswith(self.name(geo)):
+                    self.rename(coll, self.name(geo) + "_" + self.name(coll))
+                yield
+
+        # Place Objects into correct Collections
+        targets = {}
+        for coll in self.initial:
+            if "WGTS" in self.name(coll):
+                continue
+            for ob in list(self.objects[coll]):
+                if ob not in targets:
+                    targets[ob] = self.object_target(ob)
+                ob_coll_new = targets[ob]
+                if ob_coll_new is None:
+                    continue
+                self.link_object(ob_coll_new, ob)
+                if coll != ob_coll_new:
+                    self.unlink_object(coll, ob)
+                yield
+
+        # Exception: META Armatures
+        collections_all = self.hierarchy()
+        meta_obs = []
         for coll in collections_all:
-            if coll_widgets.name in coll.children:
-                coll.children.unlink(coll_widgets)
-        if not coll_widgets.name in scene.collection.children:
-            scene.collection.children.link(coll_widgets)
-        coll_widgets["skip_delete"] = 1
-
-    for coll in collections_all_extended:
-        for wgt in wgts:
-            if wgt.name in coll.children:
-                coll.children.unlink(wgt)
-    for wgt in wgts:
-        if coll_widgets:
-            if not wgt.name in coll_widgets.children:
-                coll_widgets.children.link(wgt)
-        else:
-            if not wgt.name in scene.collection.children:
-                scene.collection.children.link(wgt)
+            for ob in self.objects[coll]:
+                if ob.type == "ARMATURE" and "META" in ob.name and ob not in meta_obs:
+                    meta_obs.append(ob)
+        meta_coll = self.rig_add or self.master
+        for ob in meta_obs:
+            self.link_object(meta_coll, ob)
+            for coll in self.object_collections(ob):
+                if coll != meta_coll:
+                    self.unlink_object(coll, ob)
+            self.rename(ob.data, "DATA_" + ob.name)
 
-    # Exception: META Armatures
-    meta_obs = [
-        [ob for ob in collection.objects if (ob.type == "ARMATURE" and "META" in ob.name)]
-        for collection in collections_all_extended
+    def remove_collections(self):
+        """Remove all Scene Collections that don't pass the naming convention
+        and don't have any Objects"""
+        if not self.scene.ammopipe_remove_unused_collections:
+            return
+        for coll in self.hierarchy()[1:]:
+            if any(
+                self.name(coll).startswith(prefix + self.asset_name)
+                for prefix in self.coll_prefixes
+            ):
+                continue
+            if len(self.objects[coll]) == 0 and not self.has_id_property(coll, "skip_delete"):
+                self.delete(coll)
+
+    def resolve(self, block):
+        if isinstance(block, PlannedCollection):
+            return block.collection
+        return block
+
+    def apply(self):
+        """Perform the planned actions on the Scene"""
+        run_steps(self.apply_steps())
+
+    def apply_steps(self):
+        """apply() as a generator, yields after every action"""
+        if journal.recording:
+            yield from self.apply_recorded_steps()
+            return
+        resolve = self.resolve
+        deleted = set()
+        for action in self.actions:
+            kind = action[0]
+            if kind == "create":
+                action[1].collection = bpy.data.collections.new(action[1].name)
+            elif kind == "link_collection":
+                resolve(action[1]).children.link(resolve(action[2]))
+            elif kind == "unlink_collection":
+                resolve(action[1]).children.unlink(resolve(action[2]))
+            elif kind == "link_object":
+                resolve(action[1]).objects.link(action[2])
+            elif kind == "unlink_object":
+                resolve(action[1]).objects.unlink(action[2])
+            elif kind == "set":
+                setattr(resolve(action[1]), action[2], action[3])
+            elif kind == "id_property":
+                resolve(action[1])[action[2]] = action[3]
+            elif kind == "rename":
+                resolve(action[1]).name = action[2]
+            elif kind == "delete":
+                print("DELETED collection", action[1].name)
+                deleted.add(action[1])
+            yield
+        batch_remove_ids(deleted)
+
+    def apply_recorded_steps(self):
+        """apply_steps() writing every change to the journal,
+        the deleted Collections are only unlinked so that they can be restored"""
+        resolve = self.resolve
+        for action in self.actions:
+            kind = action[0]
+            if kind == "create":
+                action[1].collection = bpy.data.collections.new(action[1].name)
+                journal.create((action[1].collection,))
+            elif kind == "link_collection":
+                parent, child = resolve(action[1]), resolve(action[2])
+                parent.children.link(child)
+                journal.link(parent, child)
+            elif kind == "unlink_collection":
+                parent, child = resolve(action[1]), resolve(action[2])
+                parent.children.unlink(child)
+                journal.unlink(parent, child)
+            elif kind == "link_object":
+                parent = resolve(action[1])
+                parent.objects.link(action[2])
+                journal.link(parent, action[2])
+            elif kind == "unlink_object":
+                parent = resolve(action[1])
+                parent.objects.unlink(action[2])
+                journal.unlink(parent, action[2])
+            elif kind == "set":
+                block = resolve(action[1])
+                journal.set(block, action[2], getattr(block, action[2]))
+                setattr(block, action[2], action[3])
+            elif kind == "id_property":
+                block = resolve(action[1])
+                journal.id_property(block, action[2], block.get(action[2], MISSING))
+                block[action[2]] = action[3]
+            elif kind == "rename":
+                block = resolve(action[1])
+                journal.rename(block, block.name)
+                block.name = action[2]
+            elif kind == "delete":
+                print("DELETED collection", action[1].name)
+                soft_delete_collection(action[1])
+            yield
+
+
+def soft_delete_collection(coll):
+    """Unlink the Collection from all its parents and record it in the journal.
+    The orphan isn't saved with the file unless it is restored"""
+    parents = [
+        parent
+        for parent in (*(scene.collection for scene in bpy.data.scenes), *bpy.data.collections)
+        if coll.name in parent.children
     ]
-    meta_obs_flat = [item for sublist in meta_obs for item in sublist]
-    for ob in meta_obs_flat:
-        for coll in ob.users_collection:
-            coll.objects.unlink(ob)
-    for ob in meta_obs_flat:
-        if rig_add:
-            if not ob.name in rig_add.objects:
-                rig_add.objects.link(ob)
-        else:
-            if not ob.name in scene.collection.objects:
-                scene.collection.objects.link(ob)
-        ob.data.name = "DATA_" + ob.name
+    for parent in parents:
+        parent.children.unlink(coll)
+    journal.remove(coll, parents)
 
-    # Remove Collections
-    remove_collections(scene, scene.collection, coll_prefixes, asset_name)
 
+def plan_organize(scene, asset_name) -> OrganizePlan:
+    """Compute what Organize Scene has to change, without changing anything"""
+    return run_steps(plan_organize_steps(scene, asset_name))
 
-def rename_objects(scene, asset_name):
-    """Rename Objects due to their Collection name"""
+
+def plan_organize_steps(scene, asset_name):
+    """plan_organize() as a generator, yields after every Collection and Object
+    looked at and returns the plan"""
+    plan = OrganizePlan(scene, asset_name)
+    yield from plan.load_steps(plan.master)
+    plan.initial = plan.hierarchy()
+    plan.create_collections()
+    yield from plan.organize_blocks_steps()
+    plan.remove_collections()
+    return plan
+
+
+def organize_blocks(scene, asset_name) -> OrganizePlan:
+    """Create Collections and Objects with proper naming,
+    put Objects into relevant Collections based on the Object type"""
+    plan = plan_organize(scene, asset_name)
+    plan.apply()
+    return plan
+
+
+def plan_rename_objects(scene, asset_name) -> Dict:
+    """Compute the new names of the Objects due to their Collection name,
+    and of their Data, Materials and Images. Only the changed names are listed"""
+    return run_steps(plan_rename_objects_steps(scene, asset_name))
+
+
+def plan_rename_objects_steps(scene, asset_name):
+    """plan_rename_objects() as a generator, yields after every Object"""
+    renames = {}
     for ob in scene.objects:
         if "META" in ob.name:
             continue
         ob_coll = ob.users_collection[0]
-        if ob.users_collection[0] is scene.collection:
+        if ob_coll == scene.collection:
             if ob.type == "ARMATURE":
                 prefix = "RIG" + "-" + asset_name
             elif ob.type == "MESH":
@@ -341,57 +988,261 @@ def rename_objects(scene, asset_name):
             else:
                 prefix = ob_coll.name
 
-        if not ob.name.startswith(prefix):
-            ob.name = prefix + "_" + ob.name
-        elif not ob.name.split(prefix)[1].startswith("_"):
-            ob.name = ob.name.replace(prefix, (prefix + "_"))
-        else:
-            pass
-        if ob.name.endswith("_"):
-            ob.name = ob.name[:-1]
+        name = ob.name
+        if not name.startswith(prefix):
+            name = prefix + "_" + name
+        elif not name.split(prefix)[1].startswith("_"):
+            name = name.replace(prefix, (prefix + "_"))
+        if name.endswith("_"):
+            name = name[:-1]
+        if name != ob.name:
+            renames[ob] = name
         if ob.type != "EMPTY":
-            ob.data.name = "DATA_" + ob.name
+            if ob.data.name != "DATA_" + name:
+                renames[ob.data] = "DATA_" + name
+            else:
+                renames.pop(ob.data, None)
+        yield
 
     other_blocks = [bpy.data.materials, bpy.data.images]
     for collection in other_blocks:
         for block in collection:
             if not block.name.startswith(asset_name):
                 if not block.name.startswith("_"):
-                    block.name = asset_name + "_" + block.name
+                    renames[block] = asset_name + "_" + block.name
                 else:
-                    block.name = asset_name + block.name
-
-
-def seperate_string_number(string) -> Tuple:
-    """Split the current file name to digits and letters parts"""
-    previous_character = string[0]
-    groups = []
-    newword = string[0]
-    for x, i in enumerate(string[1:]):
-        if i.isalpha() and previous_character.isalpha():
-            newword += i
-        elif i.isnumeric() and previous_character.isnumeric():
-            newword += i
-        else:
-            groups.append(newword)
-            newword = i
+                    renames[block] = asset_name + block.name
+    return renames
+
+
+# ID.id_type -> bpy.data collection, for the blocks renamed in batches
+ID_TYPE_COLLECTIONS = {
+    "OBJECT": "objects",
+    "MESH": "meshes",
+    "CURVE": "curves",
+    "ARMATURE": "armatures",
+    "LATTICE": "lattices",
+    "CAMERA": "cameras",
+    "LIGHT": "lights",
+    "MATERIAL": "materials",
+    "IMAGE": "images",
+    "COLLECTION": "collections",
+    "ACTION": "actions",
+    "SCENE": "scenes",
+}
+
+
+def batch_rename(block_collection, renames) -> Dict:
+    """Rename the blocks of one bpy.data collection at once (old name -> new name).
+    The renames are ordered so that no block gets a .001 name on the way,
+    see naming.plan_renames() for the report"""
+    return run_steps(batch_rename_steps(block_collection, renames))
+
+
+def batch_rename_steps(block_collection, renames):
+    """batch_rename() as a generator, yields after every rename and returns the report.
+    It doesn't yield while a block of a cycle is parked under its temporary name,
+    so stopping it never leaves a "~" name behind"""
+    # Linked blocks can't be renamed and don't share the names with the local ones
+    blocks = {block.name: block for block in block_collection if block.library is None}
+    steps, report = plan_renames(renames, blocks.keys())
+    if journal.recording:
+        for name in report["renamed"]:
+            journal.rename(blocks[name], name)
+    # Temporary names are the ones a later step renames the block from
+    last_source = {name: i for i, (name, name_new) in enumerate(steps)}
+    parked = set()
+    for i, (name, name_new) in enumerate(steps):
+        block = blocks.pop(name)
+        block.name = name_new
+        blocks[block.name] = block
+        parked.discard(name)
+        if last_source.get(name_new, -1) > i:
+            parked.add(name_new)
+        if not parked:
+            yield
+    report["steps"] = len(steps)
+    return report
 
-        previous_character = i
 
-        if x == len(string) - 2:
-            groups.append(newword)
-            newword = ""
+def rename_blocks(renames) -> Dict:
+    """Rename the blocks of any types (block -> new name) in a batch per type.
+    Return the reports by bpy.data collection"""
+    return run_steps(rename_blocks_steps(renames))
+
+
+def rename_blocks_steps(renames):
+    """rename_blocks() as a generator, yields after every rename and returns the reports"""
+    by_collection = {}
+    for block, name in renames.items():
+        if block.library is not None:
+            continue
+        by_collection.setdefault(ID_TYPE_COLLECTIONS.get(block.id_type), {})[block] = name
+    reports = {}
+    for attr, block_renames in by_collection.items():
+        if attr is None:
+            # Not a common type, one by one
+            for block, name in block_renames.items():
+                if journal.recording:
+                    journal.rename(block, block.name)
+                block.name = name
+                yield
+            continue
+        reports[attr] = yield from batch_rename_steps(
+            getattr(bpy.data, attr),
+            {block.name: name for block, name in block_renames.items()},
+        )
+    return reports
+
+
+def rename_objects(scene, asset_name, renames=None) -> Dict:
+    """Rename Objects due to their Collection name"""
+    if renames is None:
+        renames = plan_rename_objects(scene, asset_name)
+    return rename_blocks(renames)
 
-        state = False
-        for item in groups:
-            if item.isdigit():
-                state = True
-    return (groups, state)
+
+# ID type -> bpy.data collection of all the ID types, the refs can be of any
+JOURNAL_ID_TYPES = {
+    "ACTION": "actions",
+    "ARMATURE": "armatures",
+    "BRUSH": "brushes",
+    "CACHEFILE": "cache_files",
+    "CAMERA": "cameras",
+    "COLLECTION": "collections",
+    "CURVE": "curves",
+    "CURVES": "hair_curves",
+    "FONT": "fonts",
+    "GREASEPENCIL": "grease_pencils",
+    "IMAGE": "images",
+    "KEY": "shape_keys",
+    "LATTICE": "lattices",
+    "LIBRARY": "libraries",
+    "LIGHT": "lights",
+    "LIGHT_PROBE": "lightprobes",
+    "LINESTYLE": "linestyles",
+    "MASK": "masks",
+    "MATERIAL": "materials",
+    "MESH": "meshes",
+    "META": "metaballs",
+    "MOVIECLIP": "movieclips",
+    "NODETREE": "node_groups",
+    "OBJECT": "objects",
+    "PAINTCURVE": "paint_curves",
+    "PALETTE": "palettes",
+    "PARTICLE": "particles",
+    "POINTCLOUD": "pointclouds",
+    "SCENE": "scenes",
+    "SOUND": "sounds",
+    "SPEAKER": "speakers",
+    "TEXT": "texts",
+    "TEXTURE": "textures",
+    "VOLUME": "volumes",
+    "WORKSPACE": "workspaces",
+    "WORLD": "worlds",
+}
+
+
+class JournalBlocks:
+    """Blocks of the journal refs, indexed by session_uid per type on demand"""
+
+    def __init__(self):
+        self.indices = {}
+
+    def get(self, ref):
+        id_type, uid = ref
+        index = self.indices.get(id_type)
+        if index is None:
+            if id_type == "SCENE_COLLECTION":
+                index = {scene.session_uid: scene.collection for scene in bpy.data.scenes}
+            else:
+                block_collection = getattr(bpy.data, JOURNAL_ID_TYPES.get(id_type, ""), None)
+                if block_collection is None:
+                    # A type unknown to this Blender version, look through all the IDs
+                    block_collection = [
+                        block for block in bpy.data.user_map() if block.id_type == id_type
+                    ]
+                index = {block.session_uid: block for block in block_collection}
+            self.indices[id_type] = index
+        return index.get(uid)
+
+    def value(self, value):
+        if isinstance(value, tuple) and len(value) == 2 and value[0] == "REF":
+            return self.get(value[1])
+        return value
+
+
+def journal_children(parent, child):
+    if isinstance(child, bpy.types.Object):
+        return parent.objects
+    return parent.children
+
+
+def revert_journal_step(step) -> int:
+    """Play the journal step backwards: links, values and soft-deleted blocks first,
+    then the created blocks are removed and the renamed ones get their old names back.
+    Records of the blocks that are gone are skipped. Return the number of reverted records"""
+    blocks = JournalBlocks()
+    created = set()
+    renames = {}
+    view_layers = []
+    reverted = 0
+    for record in reversed(step.records):
+        kind = record[0]
+        block = blocks.get(record[1])
+        if block is None:
+            continue
+        if kind == "rename":
+            # The oldest name comes last
+            renames[block] = record[2]
+        elif kind == "create":
+            created.add(block)
+        elif kind in ("link", "unlink"):
+            child = blocks.get(record[2])
+            if child is None:
+                continue
+            children = journal_children(block, child)
+            if kind == "link" and child.name in children:
+                children.unlink(child)
+            elif kind == "unlink" and child.name not in children:
+                children.link(child)
+        elif kind == "remove":
+            for parent in filter(None, map(blocks.get, record[2])):
+                if block.name not in parent.children:
+                    parent.children.link(block)
+        elif kind == "set":
+            setattr(block, record[2], blocks.value(record[3]))
+        elif kind == "id_property":
+            if record[3] == MISSING:
+                block.pop(record[2], None)
+            else:
+                block[record[2]] = record[3]
+        elif kind == "view_layers":
+            # Restored once everything is linked back
+            view_layers.append((block, record[2]))
+        reverted += 1
+    # The removed blocks can't be compared any more
+    renames = {block: name for block, name in renames.items() if block not in created}
+    switch_windows_scene([block for block in created if isinstance(block, bpy.types.Scene)])
+    batch_remove_ids(created)
+    rename_blocks(renames)
+    # The oldest state goes last
+    for scene, refs in view_layers:
+        state = {
+            name: (
+                {blocks.get(ref): values for ref, values in colls.items()},
+                {blocks.get(ref): hidden for ref, hidden in objects.items()},
+            )
+            for name, (colls, objects) in refs.items()
+        }
+        restore_view_layers_state(scene, state)
+    return reverted
 
 
 def next_name(filename, count) -> str:
     """Define what the digits should the next name consist of"""
-    if not seperate_string_number(filename)[1]:
+    filename_list, has_digits = seperate_string_number(filename)
+    if not has_digits:
         # E.g. add "1" if the current name has no digits at all
         if count < 10:
             zero = "0"
@@ -402,7 +1253,6 @@ def next_name(filename, count) -> str:
         else:
             return filename + str(count)
     else:
-        filename_list = seperate_string_number(filename)[0]
         # We want to take only the last digital part of the name
         filename_list.reverse()
         for i in range(len(filename_list)):
@@ -436,12 +1286,139 @@ def next_relative_name(directory_files, current_name, count) -> str:
     with all the exeisting names in the directory,
     and if there is a match then add 1 to the count parameter until we have
     the number that makes file name unique again (Make Name Unique Again!)"""
+    directory_files = set(directory_files)
     while next_name(current_name, count) in directory_files:
         count += 1
-        next_relative_name(directory_files, current_name, count)
     return next_name(current_name, count)
 
 
+# Sidecar file keeping the directory listing between the sessions
+VERSION_MANIFEST = ".ammopipe_versions.json"
+# Anything, the last digits run, no more digits till the end
+VERSION_NUMBER = re.compile(r"^(.*?)([0-9]+)([^0-9]*)$")
+
+
+class VersionIndex:
+    """Names of the .blend files in a directory with their version numbers
+    sorted per base name, so the next free version is a lookup"""
+
+    def __init__(self, directory, names, mtime):
+        self.directory = directory
+        self.mtime = mtime
+        self.names = set(names)
+        # (prefix, suffix, digits count) -> version numbers
+        self.versions = {}
+        # Same key -> (sorted numbers, last number of the run each number is in)
+        self.runs = {}
+        for name in self.names:
+            self._add_version(name)
+
+    def _add_version(self, name):
+        match = VERSION_NUMBER.match(name)
+        if match:
+            prefix, digits, suffix = match.groups()
+            key = (prefix, suffix, len(digits))
+            self.versions.setdefault(key, set()).add(int(digits))
+            self.runs.pop(key, None)
+
+    def add(self, name):
+        self.names.add(name)
+        self._add_version(name)
+
+    def first_free(self, key, number) -> int:
+        """The first version number from the given one that isn't taken"""
+        runs = self.runs.get(key)
+        if runs is None:
+            numbers = sorted(self.versions.get(key, ()))
+            ends = numbers[:]
+            for i in range(len(numbers) - 2, -1, -1):
+                if numbers[i + 1] == numbers[i] + 1:
+                    ends[i] = ends[i + 1]
+            runs = self.runs[key] = (numbers, ends)
+        numbers, ends = runs
+        i = bisect.bisect_left(numbers, number)
+        if i == len(numbers) or numbers[i] != number:
+            return number
+        return ends[i] + 1
+
+    def next_name(self, current_name, count) -> str:
+        """Same name as next_relative_name() gives, but the taken versions
+        are skipped by the whole runs instead of one by one"""
+        while True:
+            name = next_name(current_name, count)
+            if name not in self.names:
+                return name
+            match = VERSION_NUMBER.match(name)
+            if not match:
+                count += 1
+                continue
+            prefix, digits, suffix = match.groups()
+            number = int(digits)
+            free = self.first_free((prefix, suffix, len(digits)), number)
+            # next_name() may change the padding when the number gets
+            # more digits, so don't jump over the next power of ten
+            free = min(free, 10 ** len(str(number)))
+            count += max(free - number, 1)
+
+
+_version_indices: Dict = {}
+# The directory scanner thread and the main thread share the indices and the manifests
+_version_lock = threading.RLock()
+
+
+def write_version_manifest(directory, names) -> int:
+    """Store the listing next to the files, return the directory mtime it is valid for"""
+    path = os.path.join(directory, VERSION_MANIFEST)
+    try:
+        if not os.path.exists(path):
+            # Creating the file changes the directory mtime, rewriting it doesn't
+            open(path, "w").close()
+        mtime = os.stat(directory).st_mtime_ns
+        with open(path, "w") as f:
+            json.dump({"mtime": mtime, "files": sorted(names)}, f)
+    except OSError:
+        # Read-only folders still get the in-memory index
+        mtime = os.stat(directory).st_mtime_ns
+    return mtime
+
+
+def version_index(directory) -> VersionIndex:
+    """Version index of the directory. It is kept in memory and in the
+    sidecar manifest, both valid until the directory mtime changes"""
+    with _version_lock:
+        return _version_index(directory)
+
+
+def _version_index(directory) -> VersionIndex:
+    mtime = os.stat(directory).st_mtime_ns
+    index = _version_indices.get(directory)
+    if index and index.mtime == mtime:
+        return index
+    names = None
+    try:
+        with open(os.path.join(directory, VERSION_MANIFEST)) as f:
+            manifest = json.load(f)
+        if manifest["mtime"] == mtime:
+            names = manifest["files"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    if names is None:
+        names = [
+            os.path.splitext(item)[0] for item in os.listdir(directory) if item.endswith(".blend")
+        ]
+        mtime = write_version_manifest(directory, names)
+    index = _version_indices[directory] = VersionIndex(directory, names, mtime)
+    return index
+
+
+def add_version(directory, name):
+    """Register the newly saved file in the index of its directory"""
+    with _version_lock:
+        index = _version_index(directory)
+        index.add(name)
+        index.mtime = write_version_manifest(directory, index.names)
+
+
 def directory_files() -> Tuple:
     current_file = bpy.data.filepath
     directory_name = os.path.dirname(current_file)
@@ -463,100 +1440,498 @@ def directory_files_given(path) -> Tuple:
     return (directory_name, directory_files, current_file)
 
 
-def unify_scenes_names(context):
-    scenes = [scene.name for scene in bpy.data.scenes if not scene.ammopipe_source_scene]
-    scenes.sort()
-    for name in scenes:
-        index = str(scenes.index(name) + 1)
+def unify_scenes_names(context) -> Dict:
+    """Name the Scenes scene_01_suffix, scene_02_suffix... in the alphabetical order,
+    the Source Scene is _scene_source_suffix"""
+    renames = {}
+    scenes = sorted(
+        (scene for scene in bpy.data.scenes if not scene.ammopipe_source_scene),
+        key=lambda scene: scene.name,
+    )
+    for i, scene in enumerate(scenes):
+        index = str(i + 1)
         if len(index) == 1:
             zero = "0" + index
         else:
             zero = index
-        bpy.data.scenes[name].name = (
+        renames[scene.name] = (
             "scene_"
             + zero
-            + ("_" + bpy.data.scenes[name].ammopipe_scene_name_suffix)
-            * bool(len(bpy.data.scenes[name].ammopipe_scene_name_suffix))
+            + ("_" + scene.ammopipe_scene_name_suffix)
+            * bool(len(scene.ammopipe_scene_name_suffix))
         )
     for scene in bpy.data.scenes:
         if scene.ammopipe_source_scene:
-            scene.name = "_scene_source" + ("_" + scene.ammopipe_scene_name_suffix) * bool(
-                len(scene.ammopipe_scene_name_suffix)
+            renames[scene.name] = "_scene_source" + (
+                "_" + scene.ammopipe_scene_name_suffix
+            ) * bool(len(scene.ammopipe_scene_name_suffix))
+    return batch_rename(bpy.data.scenes, renames)
+
+
+# Data-blocks whose copies are tracked by the Lineage
+LINEAGE_COLLECTIONS = ("collections", "objects", "actions")
+
+
+class Lineage:
+    """Copy -> source registry of the file, read once per operation.
+    The blocks are identified by ammopipe_uid, which survives renames.
+    Every Scene keeps the entries of the copies made for it in ammopipe_lineage,
+    so they go away together with the Scene"""
+
+    def __init__(self):
+        # uid -> block, copy uid -> source uid
+        self.blocks = {}
+        self.sources = {}
+        # uid -> name the block had when it was recorded
+        names = {}
+        for scene in bpy.data.scenes:
+            for entry in scene.ammopipe_lineage:
+                self.sources[entry.copy] = entry.source
+                names[entry.copy] = entry.copy_name
+                names[entry.source] = entry.source_name
+        top = 0
+        strays = []
+        for attr in LINEAGE_COLLECTIONS:
+            for block in getattr(bpy.data, attr):
+                uid = block.ammopipe_uid
+                if not uid:
+                    continue
+                top = max(top, uid)
+                owner = self.blocks.get(uid)
+                if owner is None:
+                    self.blocks[uid] = block
+                # Duplicates made in Blender carry the uid of their original,
+                # the uid stays with the block that has the recorded name
+                elif block.name == names.get(uid) and owner.name != block.name:
+                    self.blocks[uid] = block
+                    strays.append(owner)
+                else:
+                    strays.append(block)
+        self.next_uid = top + 1
+        for block in strays:
+            self.uid(block)
+
+    def uid(self, block) -> int:
+        """uid of the block, it is given when the block is met for the first time"""
+        uid = block.ammopipe_uid
+        # Duplicates made in Blender carry the uid of their original
+        if not uid or self.blocks.get(uid) != block:
+            uid = block.ammopipe_uid = self.next_uid
+            self.next_uid += 1
+            self.blocks[uid] = block
+        return uid
+
+    def root(self, block):
+        """The first source the block was copied from, the block itself if it is not a copy"""
+        uid = block.ammopipe_uid
+        if not uid or self.blocks.get(uid) != block:
+            return block
+        root = block
+        seen = set()
+        while uid in self.sources and uid not in seen:
+            seen.add(uid)
+            uid = self.sources[uid]
+            # Sources deleted since don't break the chain
+            root = self.blocks.get(uid, root)
+        return root
+
+    def record(self, scene, copies):
+        """Add the new copies (originals -> copies map) to the Scene entries"""
+        for source, copy in copies.items():
+            # Object Data has no uid, it goes with its Object
+            if not hasattr(source, "ammopipe_uid"):
+                continue
+            entry = scene.ammopipe_lineage.add()
+            entry.source = self.uid(source)
+            entry.copy = self.uid(copy)
+            entry.source_name = source.name
+            entry.copy_name = copy.name
+            self.sources[entry.copy] = entry.source
+
+
+def propagate_share_enum(scene, coll):
+    """Give the children Collections the share mode of their parents,
+    the top Collections of the Scene keep their own"""
+    parents = [coll]
+    while parents:
+        parent = parents.pop()
+        for child in parent.children:
+            if parent != scene.collection:
+                share = parent.ammopipe_collection_share_enum
+                if child.ammopipe_collection_share_enum != share:
+                    if journal.recording:
+                        journal.set(child, "ammopipe_collection_share_enum", child.ammopipe_collection_share_enum)
+                    child.ammopipe_collection_share_enum = share
+            parents.append(child)
+
+
+def copy_object(ob, add_name, copies, lineage) -> bpy.types.Object:
+    """Copy of the Object with its Data and Action, as a full copy makes them.
+    Linked blocks aren't copied, they stay linked"""
+    if ob.library is not None:
+        return ob
+    ob_new = copies.get(ob)
+    if ob_new is None:
+        ob_new = copies[ob] = ob.copy()
+        ob_new.name = lineage.root(ob).name + add_name
+        data = ob.data
+        if data is not None and data.library is None:
+            data_new = copies.get(data)
+            if data_new is None:
+                data_new = copies[data] = data.copy()
+                data_new.name = data.name + add_name
+            ob_new.data = data_new
+        if ob.animation_data and ob.animation_data.action:
+            action = ob.animation_data.action
+            if action.library is None:
+                action_new = copies.get(action)
+                if action_new is None:
+                    action_new = copies[action] = action.copy()
+                    action_new.name = lineage.root(action).name + add_name
+                ob_new.animation_data.action = action_new
+    return ob_new
+
+
+def copy_collection_tree(coll, add_name, copies, lineage) -> bpy.types.Collection:
+    """Deep copy of the Collection with its children, Objects, their Data and Actions,
+    named after their root sources plus add_name. Linked blocks stay linked.
+    Blocks met twice in the tree are copied once, copies maps originals to them"""
+    if coll.library is not None:
+        return coll
+    coll_new = copies.get(coll)
+    if coll_new is None:
+        # Shallow copy keeps the settings and properties,
+        # its children and Objects are swapped for copies below
+        coll_new = copies[coll] = coll.copy()
+        coll_new.name = lineage.root(coll).name + add_name
+        for ob in coll.objects:
+            ob_new = copy_object(ob, add_name, copies, lineage)
+            if ob_new != ob:
+                coll_new.objects.unlink(ob)
+                coll_new.objects.link(ob_new)
+        for child in coll.children:
+            child_new = copy_collection_tree(child, add_name, copies, lineage)
+            if child_new != child:
+                coll_new.children.unlink(child)
+                coll_new.children.link(child_new)
+    return coll_new
+
+
+def remap_id_pointers(struct, copies):
+    """Point the ID properties of the struct to the copies of their values"""
+    for prop in struct.bl_rna.properties:
+        if prop.type != "POINTER" or prop.is_readonly:
+            continue
+        value = getattr(struct, prop.identifier)
+        if isinstance(value, bpy.types.ID) and value in copies:
+            setattr(struct, prop.identifier, copies[value])
+
+
+def copies_view_layers_state(view_layers_state, copies) -> Dict:
+    """Extend the state from capture_view_layers_state() to the copies of its blocks,
+    otherwise the copies start visible in every View Layer"""
+    for colls, objects in view_layers_state.values():
+        for state in (colls, objects):
+            for block in [block for block in state if block in copies]:
+                state[copies[block]] = state[block]
+    return view_layers_state
+
+
+def remap_copies(copies):
+    """Make the copied Objects use each other instead of the originals:
+    parents, modifiers, constraints, instanced Collections and drivers"""
+    for ob_new in copies.values():
+        if not isinstance(ob_new, bpy.types.Object):
+            continue
+        if ob_new.parent in copies:
+            ob_new.parent = copies[ob_new.parent]
+        if ob_new.instance_collection in copies:
+            ob_new.instance_collection = copies[ob_new.instance_collection]
+        for modifier in ob_new.modifiers:
+            remap_id_pointers(modifier, copies)
+        for constraint in ob_new.constraints:
+            remap_id_pointers(constraint, copies)
+            # Armature constraint keeps its targets in a list
+            for target in getattr(constraint, "targets", ()):
+                remap_id_pointers(target, copies)
+        if ob_new.animation_data:
+            for driver in ob_new.animation_data.drivers:
+                for variable in driver.driver.variables:
+                    for target in variable.targets:
+                        if target.id in copies:
+                            target.id = copies[target.id]
+
+
+def duplicate_scene(source_scene, name, lineage=None) -> Tuple:
+    """New Scene with the "Link" Collections of the Source Scene linked as they are
+    and the "Copy" Collections copied with their Objects and Actions.
+    The copies are named after their root sources plus "_" and the Scene name.
+    Return the Scene and the originals -> copies map"""
+    if lineage is None:
+        lineage = Lineage()
+    propagate_share_enum(source_scene, source_scene.collection)
+    # Link copy shares all the Collections and keeps the Scene settings
+    scene_new = source_scene.copy()
+    if journal.recording:
+        journal.create((scene_new,))
+    scene_new.name = name
+    add_name = "_" + scene_new.name
+    view_layers_state = capture_view_layers_state(scene_new)
+
+    copies = {}
+    master = scene_new.collection
+    children = list(master.children)
+    for child in children:
+        master.children.unlink(child)
+    # Relink in the same order
+    for child in children:
+        if child.ammopipe_collection_share_enum == "Copy":
+            child = copy_collection_tree(child, add_name, copies, lineage)
+        master.children.link(child)
+    for ob in list(master.objects):
+        ob_new = copy_object(ob, add_name, copies, lineage)
+        if ob_new != ob:
+            master.objects.unlink(ob)
+            master.objects.link(ob_new)
+    remap_copies(copies)
+    if journal.recording:
+        journal.create(copies.values())
+    # The Link copy carries the entries of the Source Scene
+    scene_new.ammopipe_lineage.clear()
+    lineage.record(scene_new, copies)
+    if scene_new.camera in copies:
+        scene_new.camera = copies[scene_new.camera]
+
+    restore_view_layers_state(scene_new, copies_view_layers_state(view_layers_state, copies))
+    return (scene_new, copies)
+
+
+def localize_collection(scene, coll) -> bpy.types.Collection:
+    """Replace the shared Collection in the Scene with a copy of its tree,
+    copies are named after their root sources plus "_" and the Scene name.
+    Nothing outside of the Collection tree is copied or removed"""
+    if coll.library is not None:
+        raise ValueError("Linked Collection " + coll.name + " stays linked")
+    parents = [
+        parent
+        for parent in (scene.collection, *scene.collection.children_recursive)
+        if coll.name in parent.children
+    ]
+    propagate_share_enum(scene, coll)
+    view_layers_state = capture_view_layers_state(scene)
+    if journal.recording:
+        journal.view_layers(scene, view_layers_state)
+    copies = {}
+    lineage = Lineage()
+    coll_new = copy_collection_tree(coll, "_" + scene.name, copies, lineage)
+    remap_copies(copies)
+    lineage.record(scene, copies)
+    if journal.recording:
+        journal.create(copies.values())
+    for parent in parents:
+        parent.children.link(coll_new)
+        parent.children.unlink(coll)
+        if journal.recording:
+            journal.link(parent, coll_new)
+            journal.unlink(parent, coll)
+    if scene.camera in copies:
+        if journal.recording:
+            journal.set(scene, "camera", scene.camera)
+        scene.camera = copies[scene.camera]
+    restore_view_layers_state(scene, copies_view_layers_state(view_layers_state, copies))
+    return coll_new
+
+
+def new_scene(source_scene, name, suffix="", lineage=None) -> bpy.types.Scene:
+    """New Scene from the Source Scene, named name_suffix"""
+    scene_new = duplicate_scene(
+        source_scene, name + ("_" + suffix) * bool(len(suffix)), lineage
+    )[0]
+    scene_new.ammopipe_workflow = source_scene.ammopipe_workflow
+    scene_new.ammopipe_scene_name_suffix = suffix
+    scene_new.ammopipe_source_scene = False
+    return scene_new
+
+
+def parse_shots(lines) -> List:
+    """Shots from the CSV lines: name, suffix, frame start, frame end.
+    Everything but the name is optional, the header, empty and # lines are skipped"""
+    shots = []
+    for row in csv.reader(lines):
+        row = [cell.strip() for cell in row]
+        if not any(row) or row[0].startswith("#") or row[0].lower() == "name":
+            continue
+        row += [""] * (4 - len(row))
+        shot = {"name": row[0], "suffix": row[1]}
+        if row[2]:
+            shot["frame_start"] = int(row[2])
+        if row[3]:
+            shot["frame_end"] = int(row[3])
+        shots.append(shot)
+    return shots
+
+
+def load_shots(filepath="", text=None) -> List:
+    """Shots from a CSV file or from a Text data-block"""
+    if text is not None:
+        return parse_shots(text.as_string().splitlines())
+    with open(bpy.path.abspath(filepath), newline="", encoding="utf-8") as f:
+        return parse_shots(f)
+
+
+def create_shots(source_scene, shots) -> List:
+    """Create a Scene from the Source Scene for every shot,
+    shots are dicts with "name" and optional "suffix", "frame_start" and "frame_end".
+    Return (Scene, seconds it took) per shot"""
+    # Read the registry once for all the shots
+    lineage = Lineage()
+    results = []
+    for shot in shots:
+        start = time.perf_counter()
+        scene_new = new_scene(source_scene, shot["name"], shot.get("suffix", ""), lineage)
+        if "frame_start" in shot:
+            scene_new.frame_start = shot["frame_start"]
+        if "frame_end" in shot:
+            scene_new.frame_end = shot["frame_end"]
+        results.append((scene_new, time.perf_counter() - start))
+    unify_scenes_names(bpy.context)
+    return results
+
+
+def is_collection_instance(ob) -> bool:
+    return ob.type == "EMPTY" and ob.instance_type == "COLLECTION" and ob.instance_collection is not None
+
+
+def find_rig(collection):
+    """The "RIG-<Collection name>" Armature of the Collection tree, None if there is none"""
+    rig_name = "RIG-" + collection.name
+    for ob in collection.all_objects:
+        if ob.type == "ARMATURE" and ob.name == rig_name:
+            return ob
+    return None
+
+
+def overrides_index() -> Dict:
+    """Reference -> its local override Objects"""
+    index = {}
+    for ob in bpy.data.objects:
+        if ob.override_library and ob.override_library.reference:
+            index.setdefault(ob.override_library.reference, []).append(ob)
+    return index
+
+
+def override_and_snap(empties, scene, view_layer) -> List:
+    """Override the rigged assets instanced by the Empties and move every Rig
+    to the place of its Empty. The overrides are made in the Scene and View Layer
+    without operators, the Empties are removed from the Scene.
+    Return (Empty name, error or None) per Empty"""
+    scene_collections = {scene.collection, *scene.collection.children_recursive}
+    # The Empties are gone once overridden, read everything beforehand
+    instances = []
+    rigs = {}
+    for empty in empties:
+        collection = empty.instance_collection
+        if collection not in rigs:
+            rigs[collection] = find_rig(collection)
+        instances.append(
+            (
+                empty,
+                empty.name,
+                collection,
+                rigs[collection],
+                (empty.location.copy(), empty.rotation_euler.copy(), empty.scale.copy()),
             )
+        )
+    # Overrides made before, not to be confused with the new ones
+    known = {ob for obs in overrides_index().values() for ob in obs}
+    results = {}
+    removed = []
 
+    def snap(empty, name, overrides, transforms):
+        for ob in overrides:
+            # The hierarchy is made of system overrides, the Rig has to be posed
+            # and moved, as make_override_library() leaves it
+            ob.override_library.is_system_override = False
+            if ob.data is not None and ob.data.override_library is not None:
+                ob.data.override_library.is_system_override = False
+            ob.location, ob.rotation_euler, ob.scale = transforms
+            known.add(ob)
+        # The override hierarchy takes the place of the Empty
+        for parent in empty.users_collection:
+            if parent in scene_collections:
+                parent.objects.unlink(empty)
+        if empty.users == 0:
+            removed.append(empty)
+        results[name] = None
 
-def blocks_recursive_property(scene, coll):
-    for source_coll in coll.children:
-        source_coll.ammopipe_source_collection = source_coll.name
-        if coll is not scene.collection:
-            source_coll.ammopipe_collection_share_enum = coll.ammopipe_collection_share_enum
-        for source_obj in source_coll.objects:
-            source_obj.ammopipe_source_object = source_obj.name
-            if source_obj.animation_data and source_obj.animation_data.action:
-                source_obj.animation_data.action.ammopipe_source_action = (
-                    source_obj.animation_data.action.name
-                )
-        if len(source_coll.children) > 0:
-            blocks_recursive_property(scene, source_coll)
-
-
-def naming_ussues(scene, block, block_collection) -> str:
-    excluded_prefixes = ["GEO-", "RIG-", "LIGHT-", "CAM-", "REF-"]
-    side_parts = {
-        ".L": ("L", "Lt", "Left"),
-        ".R": ("R", "Rt", "Right"),
-    }
-    asset_name = scene.ammopipe_naming_asset_name
-    block_name = block.name
-    if block_name.startswith("META"):
-        return block_name
-    block_start, block_end = "", ""
-    for pref in excluded_prefixes:
-        if block_name.startswith(pref + asset_name):
-            if block_name == pref + asset_name:
-                return block_name
-            else:
-                block_start = pref + asset_name
-                block_name = block_name.replace(block_start, "")
-    if block_name.startswith("_"):
-        block_name = block_name[1:]
-    block_name_seq = seperate_string_number(block_name)[0]
-    block_name_new = [block_start]
-    for item in block_name_seq:
-        if not item.isalpha() and not item.isdigit():
+    # Rig -> instances whose override hierarchy wasn't returned
+    pending = {}
+    for empty, name, collection, rig, transforms in instances:
+        if rig is None:
+            results[name] = "No rig with proper naming found"
             continue
+        try:
+            # The Empty only hints where to put the override hierarchy
+            root = collection.override_hierarchy_create(scene, view_layer, reference=empty)
+        except RuntimeError as error:
+            results[name] = str(error)
+            continue
+        overrides = [
+            ob
+            for ob in (root.all_objects if root is not None else ())
+            if ob.override_library and ob.override_library.reference == rig
+        ]
+        if overrides:
+            snap(empty, name, overrides, transforms)
         else:
-            for key in side_parts.keys():
-                combined_list = (
-                    [part for part in side_parts[key]]
-                    + [part.lower() for part in side_parts[key]]
-                    + [part.upper() for part in side_parts[key]]
-                )
-                if item in combined_list:
-                    block_end = key
-                    item = ""
-                    continue
-            if (
-                not item in excluded_prefixes
-                and not item == asset_name
-                and not item == "DATA"
-                and not item.startswith("WGT")
-                and not "META" in item
-            ):
-                item = item.lower()
-        block_name_new.append(item)
-    block_name_clean = []
-    for part in block_name_new:
-        if part != "":
-            if len(block_name_clean) > 0:
-                if part != block_name_clean[-1]:
-                    block_name_clean.append(part)
+            pending.setdefault(rig, []).append((empty, name, transforms))
+    if pending:
+        # Somewhere else, look for them among all the overrides at once
+        index = overrides_index()
+        for rig, waiting in pending.items():
+            new = [ob for ob in index.get(rig, ()) if ob not in known]
+            # One Rig override per hierarchy, in the order of their names
+            if len(waiting) == 1:
+                groups = [new]
+            elif len(new) == len(waiting):
+                groups = [[ob] for ob in new]
             else:
-                block_name_clean.append(part)
+                groups = [[]] * len(waiting)
+            for (empty, name, transforms), overrides in zip(waiting, groups):
+                if overrides:
+                    snap(empty, name, overrides, transforms)
+                else:
+                    results[name] = "Override of " + rig.name + " not found"
+    batch_remove_ids(removed)
+    return [(name, results[name]) for _, name, _, _, _ in instances]
+
+
+def data_owners() -> Dict:
+    """Map every Object Data to the Object that owns it.
+    Shared Data goes to its first user in the alphabetical order"""
+    owners = {}
+    for ob in bpy.data.objects:
+        if ob.data is None:
+            continue
+        owner = owners.get(ob.data)
+        if owner is None or ob.name < owner.name:
+            owners[ob.data] = ob
+    return owners
+
+
+def naming_rules():
+    """Naming rules of the project the current file belongs to"""
+    if bpy.data.filepath:
+        return load_rules(os.path.dirname(bpy.data.filepath))
+    return load_rules()
+
 
-    name = "_".join(block_name_clean)
-    if block_end != "":
-        name += block_end
+def naming_ussues(scene, block, block_collection, owners=None) -> str:
+    """Standardized name of the block. Pass the owners map from data_owners()
+    when naming many blocks, otherwise it is built for every call"""
+    name, final = naming_rules().resolve(block.name, scene.ammopipe_naming_asset_name)
+    if final:
+        return name
 
     if block_collection in [
         bpy.data.meshes,
@@ -565,10 +1940,9 @@ def naming_ussues(scene, block, block_collection) -> str:
         bpy.data.cameras,
         bpy.data.lights,
     ]:
-        users = [o for o in bpy.data.objects if o.user_of_id(block.id_data)]
-        user = None
-        if len(users) > 0:
-            user = users[0]
+        if owners is None:
+            owners = data_owners()
+        user = owners.get(block.id_data)
         if user:
             name = ("DATA_" + user.name).replace("__", "_")
 
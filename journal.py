@@ -0,0 +1,150 @@
+"""Journal of the changes made by the bulk operators.
+
+A light alternative to the global undo for the huge files: the undo step
+holds a copy of the whole file, while the journal step holds only what the
+operator changed. functions.revert_journal_step() plays a step backwards.
+
+The blocks are referred to by their ID type and session_uid, never by the
+blocks themselves, so the journal doesn't keep anything alive. Removed blocks
+are only unlinked ("soft-deleted"), Blender drops them on save as any orphan.
+"""
+
+import bpy
+from bpy.app.handlers import persistent
+from contextlib import contextmanager
+
+# ID property value of a block that had no such property
+MISSING = ("MISSING",)
+
+
+class JournalStep:
+    """Records of one operator run, in the order they happened.
+    changed is cleared by the operators that turned out to change nothing"""
+
+    __slots__ = ("name", "records", "changed")
+
+    def __init__(self, name):
+        self.name = name
+        self.records = []
+        self.changed = True
+
+
+class Journal:
+    """The recorded steps, the last one is reverted first"""
+
+    # Steps kept for reverting
+    keep = 16
+
+    def __init__(self):
+        self.steps = []
+        self.current = None
+        self.depth = 0
+
+    @property
+    def recording(self) -> bool:
+        return self.current is not None
+
+    def clear(self):
+        self.steps.clear()
+
+    @contextmanager
+    def step(self, name, enabled=True):
+        """Record the changes made inside as one step, when enabled.
+        Nested steps are merged into the outermost one"""
+        if not enabled:
+            yield None
+            return
+        if self.depth == 0:
+            self.current = JournalStep(name)
+        self.depth += 1
+        try:
+            yield self.current
+        finally:
+            self.depth -= 1
+            if self.depth == 0:
+                # Also when it failed half way, what was done can be reverted
+                if self.current.records:
+                    self.steps.append(self.current)
+                    del self.steps[: -self.keep]
+                    print(f"AmmoPipe journal: {self.current.name}, {len(self.current.records)} records")
+                self.current = None
+
+    def ref(self, block):
+        """(ID type, session_uid) of the block, Scene Collections go by their Scene"""
+        if block.is_embedded_data and isinstance(block, bpy.types.Collection):
+            for scene in bpy.data.scenes:
+                if scene.collection == block:
+                    return ("SCENE_COLLECTION", scene.session_uid)
+        return (block.id_type, block.session_uid)
+
+    def value(self, value):
+        # Pointers to blocks are stored as refs as well
+        if isinstance(value, bpy.types.ID):
+            return ("REF", self.ref(value))
+        return value
+
+    def rename(self, block, name_old):
+        self.current.records.append(("rename", self.ref(block), name_old))
+
+    def link(self, parent, child):
+        self.current.records.append(("link", self.ref(parent), self.ref(child)))
+
+    def unlink(self, parent, child):
+        self.current.records.append(("unlink", self.ref(parent), self.ref(child)))
+
+    def create(self, blocks):
+        self.current.records.extend(("create", self.ref(block)) for block in blocks)
+
+    def remove(self, block, parents):
+        """The block was unlinked from all its parents instead of being removed"""
+        self.current.records.append(
+            ("remove", self.ref(block), tuple(self.ref(parent) for parent in parents))
+        )
+
+    def set(self, block, attr, value_old):
+        self.current.records.append(("set", self.ref(block), attr, self.value(value_old)))
+
+    def id_property(self, block, key, value_old):
+        """value_old is MISSING when the block had no such property"""
+        self.current.records.append(("id_property", self.ref(block), key, value_old))
+
+    def view_layers(self, scene, state):
+        """View Layers state of the Scene from functions.capture_view_layers_state(),
+        relinking the blocks back resets it"""
+        refs = {
+            name: (
+                {self.ref(coll): values for coll, values in colls.items()},
+                {self.ref(ob): hidden for ob, hidden in objects.items()},
+            )
+            for name, (colls, objects) in state.items()
+        }
+        self.current.records.append(("view_layers", self.ref(scene), refs))
+
+
+journal = Journal()
+
+
+@persistent
+def journal_reset(dummy):
+    # The recorded state is gone with the undo or the old file
+    journal.clear()
+
+
+handlers = (
+    bpy.app.handlers.undo_post,
+    bpy.app.handlers.redo_post,
+    bpy.app.handlers.load_post,
+)
+
+
+def register():
+    for handler_list in handlers:
+        if journal_reset not in handler_list:
+            handler_list.append(journal_reset)
+
+
+def unregister():
+    for handler_list in handlers:
+        if journal_reset in handler_list:
+            handler_list.remove(journal_reset)
+    journal.clear()
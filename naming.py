@@ -0,0 +1,284 @@
+"""Naming rules of the Ammonite Pipeline.
+
+This module doesn't depend on bpy, so the names can be validated outside of
+Blender as well, e.g. from the farm scripts:
+
+    sys.path.append("path/to/ammopipe")
+    import naming
+    rules = naming.load_rules("path/to/project")
+    names_new = naming.normalize_many(names, "asset", rules)
+
+The rules are read from the "ammopipe_naming.json" file found in the given
+folder or any of its parents, missing keys fall back to DEFAULT_RULES.
+
+plan_renames() orders a whole batch of renames so that no name collides
+on the way, see functions.batch_rename() for applying it to the blocks.
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+CONFIG_NAME = "ammopipe_naming.json"
+# Blender keeps 63 bytes of the data-block names
+MAX_NAME_BYTES = 63
+
+DEFAULT_RULES = {
+    # Collection prefixes that are combined with the Asset name
+    "prefixes": ["GEO-", "RIG-", "LIGHT-", "CAM-", "REF-"],
+    # Suffix -> spellings of the side part, in any case
+    "sides": {
+        ".L": ["L", "Lt", "Left"],
+        ".R": ["R", "Rt", "Right"],
+    },
+    # Parts of the name that keep their case
+    "reserved": ["DATA"],
+    "reserved_prefixes": ["WGT"],
+    "reserved_contains": ["META"],
+    # Names starting with these are left untouched
+    "untouched_prefixes": ["META"],
+    # "lower", "upper" or "keep"
+    "case": "lower",
+}
+
+
+@lru_cache(maxsize=2**16)
+def _tokenize(string) -> Tuple:
+    groups = []
+    start = 0
+    previous_character = string[0]
+    for x in range(1, len(string)):
+        i = string[x]
+        # Letters stick to letters, digits to digits, anything else stays alone
+        if not (
+            (i.isalpha() and previous_character.isalpha())
+            or (i.isnumeric() and previous_character.isnumeric())
+        ):
+            groups.append(string[start:x])
+            start = x
+        previous_character = i
+    groups.append(string[start:])
+    return (tuple(groups), any(item.isdigit() for item in groups))
+
+
+def seperate_string_number(string) -> Tuple:
+    """Split the current file name to digits and letters parts.
+    Return the parts list and whether any of the parts are digits"""
+    if not string:
+        return ([], False)
+    groups, state = _tokenize(string)
+    # The cached parts are shared, the callers get their own list
+    return (list(groups), state)
+
+
+class NamingRules:
+    """Naming rules compiled into lookup tables.
+    The results are memoized per (name, asset name)"""
+
+    def __init__(self, config=None):
+        config = dict(DEFAULT_RULES, **(config or {}))
+        self.prefixes = tuple(config["prefixes"])
+        self.prefixes_set = frozenset(self.prefixes)
+        self.untouched_prefixes = tuple(config["untouched_prefixes"])
+        # Every spelling of the side part -> suffix, the first side wins
+        self.sides = {}
+        for key, parts in config["sides"].items():
+            for part in parts:
+                for spelling in (part, part.lower(), part.upper()):
+                    self.sides.setdefault(spelling, key)
+        self.reserved = frozenset(config["reserved"])
+        reserved_patterns = ["^" + re.escape(part) for part in config["reserved_prefixes"]]
+        reserved_patterns += [re.escape(part) for part in config["reserved_contains"]]
+        self.reserved_re = re.compile("|".join(reserved_patterns)) if reserved_patterns else None
+        if config["case"] not in ("lower", "upper", "keep"):
+            raise ValueError("Unknown case policy: " + str(config["case"]))
+        self.case = config["case"]
+        self.resolve = lru_cache(maxsize=2**18)(self._resolve)
+
+    def normalize(self, block_name, asset_name) -> str:
+        return self.resolve(block_name, asset_name)[0]
+
+    def _keeps_case(self, item, asset_name) -> bool:
+        return (
+            item in self.prefixes_set
+            or item == asset_name
+            or item in self.reserved
+            or (self.reserved_re is not None and self.reserved_re.search(item) is not None)
+        )
+
+    def _resolve(self, block_name, asset_name) -> Tuple:
+        """Return the new name and whether the name is final as it is"""
+        if block_name.startswith(self.untouched_prefixes):
+            return (block_name, True)
+        block_start, block_end = "", ""
+        for pref in self.prefixes:
+            if block_name.startswith(pref + asset_name):
+                if block_name == pref + asset_name:
+                    return (block_name, True)
+                else:
+                    block_start = pref + asset_name
+                    block_name = block_name.replace(block_start, "")
+        if block_name.startswith("_"):
+            block_name = block_name[1:]
+        block_name_seq = seperate_string_number(block_name)[0] if block_name else []
+        block_name_new = [block_start]
+        for item in block_name_seq:
+            if not item.isalpha() and not item.isdigit():
+                continue
+            side = self.sides.get(item)
+            if side is not None:
+                block_end = side
+                item = ""
+            elif self.case != "keep" and not self._keeps_case(item, asset_name):
+                item = item.lower() if self.case == "lower" else item.upper()
+            block_name_new.append(item)
+        block_name_clean = []
+        for part in block_name_new:
+            if part != "":
+                if len(block_name_clean) > 0:
+                    if part != block_name_clean[-1]:
+                        block_name_clean.append(part)
+                else:
+                    block_name_clean.append(part)
+
+        return ("_".join(block_name_clean) + block_end, False)
+
+
+def find_config(directory) -> str:
+    """Path of the naming config in the directory or its parents, "" if there is none"""
+    directory = os.path.abspath(directory)
+    while True:
+        path = os.path.join(directory, CONFIG_NAME)
+        if os.path.isfile(path):
+            return path
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return ""
+        directory = parent
+
+
+# Directory -> rules, config path -> rules
+_rules_cache: Dict = {}
+_configs_cache: Dict = {}
+
+
+def load_rules(directory=None) -> NamingRules:
+    """Compiled rules of the project the directory belongs to.
+    Defaults are used when there is no directory or no config"""
+    directory = directory or ""
+    rules = _rules_cache.get(directory)
+    if rules is None:
+        path = find_config(directory) if directory else ""
+        rules = _configs_cache.get(path)
+        if rules is None:
+            config = None
+            if path:
+                with open(path, encoding="utf-8") as f:
+                    config = json.load(f)
+            rules = _configs_cache[path] = NamingRules(config)
+        _rules_cache[directory] = rules
+    return rules
+
+
+def clear_rules_cache():
+    _rules_cache.clear()
+    _configs_cache.clear()
+
+
+def normalize_name(name, asset_name, rules=None) -> str:
+    """Standardized name according to the rules"""
+    return (rules or load_rules()).normalize(name, asset_name)
+
+
+def normalize_many(names, asset_name, rules=None) -> List:
+    """Standardized names for a list of plain strings, in the same order"""
+    normalize = (rules or load_rules()).normalize
+    return [normalize(name, asset_name) for name in names]
+
+
+def clip_name(name, max_bytes=MAX_NAME_BYTES) -> str:
+    """Cut the name to max_bytes of UTF-8, without splitting a character"""
+    return name.encode("utf-8")[:max_bytes].decode("utf-8", "ignore")
+
+
+def unique_name(name, taken, max_bytes=MAX_NAME_BYTES) -> str:
+    """The name with the lowest free .001 like suffix, the way Blender does it"""
+    number = 1
+    while True:
+        suffix = ".%03d" % number
+        candidate = clip_name(name, max_bytes - len(suffix)) + suffix
+        if candidate not in taken:
+            return candidate
+        number += 1
+
+
+def plan_renames(renames, names, max_bytes=MAX_NAME_BYTES) -> Tuple:
+    """Order a batch of renames within one namespace (old name -> new name),
+    names are all the names the namespace has now.
+    Too long names are cut, names taken by the blocks that stay or by another
+    rename get a .001 like suffix, cycles (a -> b, b -> a) go through temporary names.
+    Return the (from, to) steps in the order to apply them and the report:
+    renamed (old -> final name), truncated and collisions (old -> wanted name)
+    and the number of temporary names"""
+    report = {"renamed": {}, "truncated": {}, "collisions": {}, "temporary": 0}
+    wanted = {}
+    for old, new in renames.items():
+        if old not in names:
+            continue
+        clipped = clip_name(new, max_bytes)
+        if clipped != new:
+            report["truncated"][old] = new
+        if clipped != old:
+            wanted[old] = clipped
+    # Blocks that keep their names win over the renamed ones
+    finals = set(names) - set(wanted)
+    final = {}
+    for old in sorted(wanted):
+        new = wanted[old]
+        if new in finals:
+            report["collisions"][old] = new
+            new = unique_name(new, finals, max_bytes)
+        finals.add(new)
+        final[old] = new
+    report["renamed"] = dict(final)
+
+    steps = []
+    taken = set(names) | finals
+    # Name -> old name of the renamed block that has it now
+    holders = {old: old for old in final}
+    current = dict(holders)
+    done = set()
+    visiting = set()
+    for start in sorted(final):
+        stack = [start]
+        while stack:
+            old = stack[-1]
+            if old in done:
+                stack.pop()
+                continue
+            visiting.add(old)
+            new = final[old]
+            holder = holders.get(new)
+            if holder is not None and holder not in done:
+                if holder not in visiting:
+                    # Move the block out of the way first
+                    stack.append(holder)
+                    continue
+                # Cycle, park the holder under a temporary name
+                temp = unique_name("~" + new, taken, max_bytes)
+                taken.add(temp)
+                steps.append((new, temp))
+                del holders[new]
+                holders[temp] = holder
+                current[holder] = temp
+                report["temporary"] += 1
+            steps.append((current[old], new))
+            del holders[current[old]]
+            holders[new] = old
+            current[old] = new
+            done.add(old)
+            visiting.discard(old)
+            stack.pop()
+    return (steps, report)
@@ -1,6 +1,7 @@
 import bpy
 import os
-from pathlib import Path
+import time
+from contextlib import ExitStack, contextmanager
 
 from bpy.props import StringProperty, IntProperty, BoolProperty, CollectionProperty
 from bpy.types import (
@@ -9,6 +10,25 @@ from bpy.types import (
 )
 
 from .functions import *
+from . import api
+from .cache import (
+    naming_index,
+    directory_scanner,
+    fingerprint_cache,
+    invalidation_batch,
+    NAMING_COLLECTIONS,
+)
+from .tasks import task_queue, Task, move_file, make_folders
+from .journal import journal, JournalStep
+
+
+class Lineage_Entry(PropertyGroup):
+    # ammopipe_uid of the copy and of the block it was copied from
+    copy: IntProperty()
+    source: IntProperty()
+    # Their names when recorded, to tell the original from its Shift+D duplicates
+    copy_name: StringProperty()
+    source_name: StringProperty()
 
 
 class Project_Scenes(PropertyGroup):
@@ -103,49 +123,184 @@ class PIPE_OT_Project_Scene_Remove(Operator):
         return {"FINISHED"}
 
 
-class PIPE_OT_Organize_Scene(Operator):
+@contextmanager
+def journal_step(context, name):
+    """Record the changes made inside in the journal when it is on, otherwise
+    push a global undo step at the end: the journaled operators have no "UNDO"
+    option, so the mode is read on every run and can be switched any time.
+    As for a CANCELLED "UNDO" operator, nothing is pushed when the operator
+    clears step.changed"""
+    enabled = context.window_manager.ammopipe_journal
+    with journal.step(name, enabled) as step:
+        if step is None:
+            step = JournalStep(name)
+        yield step
+    if not enabled and step.changed and bpy.ops.ed.undo_push.poll():
+        bpy.ops.ed.undo_push(message=name)
+
+
+class Chunked_Operator:
+    """Operator doing its work in steps(context, progress), a generator counted
+    by progress.track() whose return value goes to done().
+    Executed it runs at once, invoked it runs modal, at most chunk_time seconds
+    of work per timer tick, with the progress on the cursor. The viewport can be
+    navigated meanwhile, Esc stops it between two chunks keeping what was done so far"""
+
+    # Seconds of work between two redraws
+    chunk_time = 0.016
+    # Events passed through while running, none of them edits the data
+    pass_through_events = {
+        "MOUSEMOVE",
+        "INBETWEEN_MOUSEMOVE",
+        "MIDDLEMOUSE",
+        "WHEELUPMOUSE",
+        "WHEELDOWNMOUSE",
+        "TRACKPADPAN",
+        "TRACKPADZOOM",
+        "MOUSEROTATE",
+        "NDOF_MOTION",
+        "WINDOW_DEACTIVATE",
+        "TIMER_REPORT",
+    }
+
+    def error(self, context) -> str:
+        """Reason not to start, "" if there is none"""
+        return ""
+
+    def done(self, context, result) -> Tuple:
+        """Operator return status and the message"""
+        return ("FINISHED", "")
+
+    def begin(self, context):
+        self._progress = Progress()
+        self._steps = self.steps(context, self._progress)
+        # One invalidation batch and journal step over all the chunks
+        self._contexts = ExitStack()
+        self._contexts.enter_context(invalidation_batch(self.bl_label))
+        self._step = self._contexts.enter_context(journal_step(context, self.bl_label))
+        self._start = time.perf_counter()
+
+    def end(self, context, result=None, cancelled=False):
+        if cancelled:
+            status, message = ("CANCELLED", "")
+            self._step.changed = self._progress.done > 0
+        else:
+            status, message = self.done(context, result)
+            self._step.changed = status == "FINISHED"
+        self._contexts.close()
+        seconds = time.perf_counter() - self._start
+        count = self._progress.done
+        throughput = f"{count} blocks in {seconds:.2f} s, {count / max(seconds, 0.001):.0f} per second"
+        if cancelled:
+            self.report({"WARNING"}, f"{self.bl_label} cancelled after {throughput}")
+            # What was done already got its undo step or journal step
+            return {"CANCELLED"}
+        if status == "FINISHED":
+            message = (message + ", " if message else "") + throughput
+        self.report({"INFO"}, message)
+        return {status}
+
+    def execute(self, context):
+        error = self.error(context)
+        if error:
+            self.report({"ERROR"}, error)
+            return {"CANCELLED"}
+        self.begin(context)
+        try:
+            result = run_steps(self._steps)
+        except BaseException:
+            self._contexts.close()
+            raise
+        return self.end(context, result)
+
+    def invoke(self, context, event):
+        error = self.error(context)
+        if error:
+            self.report({"ERROR"}, error)
+            return {"CANCELLED"}
+        self.begin(context)
+        wm = context.window_manager
+        wm.progress_begin(0, 100)
+        self._timer = wm.event_timer_add(0.001, window=context.window)
+        wm.modal_handler_add(self)
+        return {"RUNNING_MODAL"}
+
+    def stop(self, context):
+        wm = context.window_manager
+        wm.event_timer_remove(self._timer)
+        wm.progress_end()
+
+    def modal(self, context, event):
+        if event.type == "ESC" and event.value == "PRESS":
+            self._steps.close()
+            self.stop(context)
+            return self.end(context, cancelled=True)
+        if event.type in self.pass_through_events:
+            return {"PASS_THROUGH"}
+        if event.type != "TIMER":
+            # Nothing else may touch the data in between
+            return {"RUNNING_MODAL"}
+        deadline = time.perf_counter() + self.chunk_time
+        try:
+            while time.perf_counter() < deadline:
+                next(self._steps)
+        except StopIteration as stop:
+            self.stop(context)
+            return self.end(context, stop.value)
+        except BaseException:
+            self.stop(context)
+            self._contexts.close()
+            raise
+        context.window_manager.progress_update(int(100 * self._progress.fraction))
+        return {"RUNNING_MODAL"}
+
+    def cancel(self, context):
+        # Blender ends the modal run, e.g. when a file is loaded
+        self._steps.close()
+        self.stop(context)
+        self._contexts.close()
+
+
+class PIPE_OT_Organize_Scene(Chunked_Operator, Operator):
     """Create Collections and Objects with proper naming,
     put Objects into relevant Collections based on the Object type"""
 
     bl_idname = "pipeline.organzie_scene"
     bl_label = "Organize Scene"
-    bl_options = {"REGISTER", "UNDO"}
+    bl_options = {"REGISTER"}
 
     asset_name: StringProperty()
 
-    def execute(self, context):
-        # Capture visibility
-        # I moved this out of function because when inside
-        # the "viewport hide" is reset for some reason
-        hide_dict = {}
-        for ob in context.scene.objects:
-            hide_dict[ob] = ob.hide_get()
-
+    def error(self, context) -> str:
         if self.asset_name == "":
-            self.report({"ERROR"}, "Asset Name can't be empty")
-            return {"FINISHED"}
-        else:
+            return "Asset Name can't be empty"
+        return ""
 
-            for coll in context.scene.collection.children_recursive:
-                layer_coll = recurLayerCollection(
-                    context.view_layer.layer_collection, coll.name
-                )
-                coll["exclude"] = layer_coll.exclude
-            organize_blocks(context.scene, self.asset_name)
-            for coll in context.scene.collection.children_recursive:
-                layer_coll = recurLayerCollection(
-                    context.view_layer.layer_collection, coll.name
-                )
-                if "exclude" in coll.keys():
-                    layer_coll.exclude = coll["exclude"]
+    def steps(self, context, progress):
+        return api.organize_steps(context.scene, self.asset_name, progress)
 
-        # Restore visibility
-        for ob in context.scene.objects:
-            ob.hide_set(hide_dict[ob])
-        # Rename Objects
-        rename_objects(context.scene, self.asset_name)
+    def done(self, context, result) -> Tuple:
+        actions, renamed = result
+        if not actions and not renamed:
+            return ("CANCELLED", "Scene is already organized")
+        return ("FINISHED", f"{actions} changes, {renamed} blocks renamed")
 
-        return {"FINISHED"}
+
+def version_saved(saving, directory, version, temp_path):
+    """on_done of the version moving Task, the version is registered once it is in place"""
+
+    def on_done(task):
+        saving.discard((directory, version))
+        if task.status == "DONE":
+            add_version(directory, version)
+            print("Saved", version)
+        else:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            print("Not saved", version + ":", task.status.lower(), task.message)
+        directory_scanner.refresh(directory)
+
+    return on_done
 
 
 class PIPE_OT_Incremental_Save(Operator):
@@ -156,6 +311,9 @@ class PIPE_OT_Incremental_Save(Operator):
     bl_label = "Save Version"
     bl_options = {"REGISTER", "UNDO"}
 
+    # (directory, version) of the files being moved
+    saving = set()
+
     count: IntProperty()
 
     def execute(self, context):
@@ -163,14 +321,34 @@ class PIPE_OT_Incremental_Save(Operator):
         if not bpy.data.is_saved:
             bpy.ops.wm.save_as_mainfile("INVOKE_DEFAULT")
             return {"FINISHED"}
+        directory = os.path.dirname(bpy.data.filepath)
         # File name before the extension
-        name = os.path.splitext(os.path.basename(directory_files()[2]))[0]
+        name = os.path.splitext(os.path.basename(bpy.data.filepath))[0]
+        index = version_index(directory)
+        count = self.count
+        version = index.next_name(name, count)
+        # Versions still being moved aren't in the index yet
+        while (directory, version) in self.saving:
+            count += 1
+            version = index.next_name(name, count)
         # Don't forget to bring the extension back
-        new_name = next_relative_name(directory_files()[1], name, self.count) + ".blend"
-        inc_path = os.path.join(directory_files()[0], new_name)
-        bpy.ops.wm.save_as_mainfile(filepath=inc_path, copy=True)  # Save it
+        new_name = version + ".blend"
+        inc_path = os.path.join(directory, new_name)
+        # Save a local copy and move it to the folder in the background.
+        # It goes next to the current file, so the relative paths stay as they are
+        temp_path = os.path.join(bpy.app.tempdir, new_name)
+        bpy.ops.wm.save_as_mainfile(filepath=temp_path, copy=True, relative_remap=False)
+        self.saving.add((directory, version))
+        task_queue.add(
+            Task(
+                "Save " + new_name,
+                move_file,
+                (temp_path, inc_path),
+                on_done=version_saved(self.saving, directory, version, temp_path),
+            )
+        )
 
-        self.report({"INFO"}, "Incremental Saved " + new_name)
+        self.report({"INFO"}, "Saving " + new_name + " in the background")
 
         return {"FINISHED"}
 
@@ -180,11 +358,12 @@ class PIPE_OT_Unify_Scenes_Names(Operator):
 
     bl_idname = "pipeline.unify_scenes_names"
     bl_label = "Unify Scenes Names"
-    bl_options = {"REGISTER", "UNDO"}
+    bl_options = {"REGISTER"}
 
     def execute(self, context):
 
-        unify_scenes_names(context)
+        with invalidation_batch("Unify Scenes Names"), journal_step(context, "Unify Scenes Names"):
+            unify_scenes_names(context)
 
         return {"FINISHED"}
 
@@ -240,7 +419,7 @@ class WM_OT_Add_New_Scene(bpy.types.Operator):
 
     bl_label = "Add_New_Scene"
     bl_idname = "wm.add_new_scene"
-    bl_option = {"REGISTER", "UNDO"}
+    bl_options = {"REGISTER"}
 
     name: StringProperty(name="Name", default="")
     suffix: StringProperty(name="Suffix", default="")
@@ -250,59 +429,11 @@ class WM_OT_Add_New_Scene(bpy.types.Operator):
         return any(scene for scene in bpy.data.scenes if scene.ammopipe_source_scene)
 
     def execute(self, context):
-        suffix = self.suffix
-        if len(suffix) > 0:
-            suffix = "_" + suffix
-        # Ensure all the blocks have info about themselves
-        # They will be copied in a new scene thus we'll have
-        # a method to connect a copied block with its original
-        source_scene = [
-            scene for scene in bpy.data.scenes if scene.ammopipe_source_scene
-        ][0]
-        blocks_recursive_property(source_scene, source_scene.collection)
-
-        # Create a copy Scene
-        bpy.ops.scene.new(type="FULL_COPY")
-        scene_new = context.window.scene
-        scene_new.name = self.name + suffix
-        scene_new.ammopipe_workflow = source_scene.ammopipe_workflow
-        scene_new.ammopipe_scene_name_suffix = self.suffix
-        scene_new.ammopipe_source_scene = False
-
-        add_name = "_" + scene_new.name
-        # Unlink and delete the Collections that should have been shared instead
-        for coll_new in scene_new.collection.children:
-            if (
-                bpy.data.collections[
-                    coll_new.ammopipe_source_collection
-                ].ammopipe_collection_share_enum
-                == "Link"
-            ):
-                for child_coll_new in coll_new.children_recursive:
-                    for ob_new in child_coll_new.objects:
-                        if ob_new.animation_data and ob_new.animation_data.action:
-                            bpy.data.actions.remove(ob_new.animation_data.action)
-                        bpy.data.objects.remove(ob_new)
-                    bpy.data.collections.remove(child_coll_new)
-                bpy.data.collections.remove(coll_new)
-        # Link them in a copied Scene
-        for coll_old in source_scene.collection.children:
-            if coll_old.ammopipe_collection_share_enum == "Link":
-                scene_new.collection.children.link(coll_old)
-        # Return correct names for the copied Collections, Objects and Actions
-        for coll_new in scene_new.collection.children_recursive:
-            coll_source = bpy.data.collections[coll_new.ammopipe_source_collection]
-            if coll_source.ammopipe_collection_share_enum == "Copy":
-                for ob_new in coll_new.objects:
-                    if ob_new.animation_data and ob_new.animation_data.action:
-                        action = ob_new.animation_data.action
-                        action_source = bpy.data.actions[action.ammopipe_source_action]
-                        ob_new.animation_data.action.name = (
-                            action_source.name + add_name
-                        )
-                    ob_source = bpy.data.objects[ob_new.ammopipe_source_object]
-                    ob_new.name = ob_source.name + add_name
-                coll_new.name = coll_source.name + add_name
+        # Create a Scene sharing the "Link" Collections
+        # and holding copies of the "Copy" ones
+        with invalidation_batch("New Scene"), journal_step(context, "New Scene"):
+            scene_new = api.new_scene(self.name, self.suffix)
+        context.window.scene = scene_new
 
         return {"FINISHED"}
 
@@ -310,6 +441,55 @@ class WM_OT_Add_New_Scene(bpy.types.Operator):
         return context.window_manager.invoke_props_dialog(self)
 
 
+class WM_OT_Add_New_Scenes_Batch(Operator):
+    """Add a New Scene from Source for every shot of the list.
+    \nThe list is a CSV file or a Text with lines: name, suffix, frame start, frame end"""
+
+    bl_label = "Add New Scenes from Shots List"
+    bl_idname = "wm.add_new_scenes_batch"
+    bl_options = {"REGISTER"}
+
+    filepath: StringProperty(name="CSV File", subtype="FILE_PATH", default="")
+    text: StringProperty(name="Text", default="")
+
+    @classmethod
+    def poll(cls, context):
+        return any(scene for scene in bpy.data.scenes if scene.ammopipe_source_scene)
+
+    def execute(self, context):
+        try:
+            if self.text:
+                shots = load_shots(text=bpy.data.texts[self.text])
+            else:
+                shots = load_shots(self.filepath)
+        except (KeyError, OSError, ValueError) as error:
+            self.report({"ERROR"}, "Can't read the shots list: " + str(error))
+            return {"CANCELLED"}
+        if not shots:
+            self.report({"ERROR"}, "The shots list is empty")
+            return {"CANCELLED"}
+
+        start = time.perf_counter()
+        with invalidation_batch("New Scenes from Shots List"), journal_step(context, "New Scenes"):
+            results = api.create_shots(shots)
+        for scene_new, seconds in results:
+            print(f"Created {scene_new.name} in {seconds:.2f} s")
+        context.window.scene = results[-1][0]
+        self.report(
+            {"INFO"},
+            f"Created {len(results)} Scenes in {time.perf_counter() - start:.2f} s",
+        )
+        return {"FINISHED"}
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, "filepath")
+        layout.prop_search(self, "text", bpy.data, "texts")
+
+
 class PIPE_OT_Set_Source_Scene(Operator):
     """Set current Scene as the source for creating (duplicating) the new scenes"""
 
@@ -330,53 +510,30 @@ class WM_OT_Delete_Current_Scene(Operator):
 
     bl_label = "Delete Current Scene?"
     bl_idname = "wm.delete_current_scene"
-    bl_option = {"REGISTER", "UNDO"}
+    bl_options = {"REGISTER", "UNDO"}
 
     @classmethod
     def poll(cls, context):
         return not context.scene.ammopipe_source_scene
 
-    def recursive_orphan_delete(self, data):
-        for block in data:
-            if block.users == 0:
-                data.remove(block)
-        if any(block for block in data if block.users == 0):
-            self.recursive_orphan_delete(data)
-
     def execute(self, context):
-        """
-        datas = [
-            bpy.data.collections,
-            bpy.data.objects,
-            bpy.data.meshes,
-            bpy.data.actions,
-        ]
-        for coll_del in context.scene.collection.children_recursive:
-            del_state = True
-            if any(
-                scene
-                for scene in bpy.data.scenes
-                if coll_del in scene.collection.children_recursive
-                and scene is not context.scene
-            ):
-                del_state = False
-            if del_state:
-                for ob_del in coll_del.objects:
-                    if ob_del.animation_data and ob_del.animation_data.action:
-                        bpy.data.actions.remove(ob_del.animation_data.action)
-                    bpy.data.objects.remove(ob_del)
-                bpy.data.collections.remove(coll_del)
-        """
-        # I'll try existing purge operator
-        # as manual removal takes enormous amount of time
-        bpy.data.scenes.remove(context.scene, do_unlink=True)
-        bpy.ops.outliner.orphans_purge(
-            do_local_ids=True, do_linked_ids=True, do_recursive=True
+        # Only the data the deleted Scene uses alone,
+        # the unrelated orphans are left for the user to purge
+        try:
+            with invalidation_batch("Delete Scene"):
+                removed = api.delete_scene(context.scene)
+        except ValueError as error:
+            self.report({"ERROR"}, str(error))
+            return {"CANCELLED"}
+        for id_type, (count, size) in sorted(removed.items()):
+            print(f"Deleted {count} {id_type}, ~{size_string(size)}")
+        self.report(
+            {"INFO"},
+            "Deleted {} data-blocks, ~{} freed".format(
+                sum(count for count, size in removed.values()),
+                size_string(sum(size for count, size in removed.values())),
+            ),
         )
-        """
-        for data in datas:
-            self.recursive_orphan_delete(data)
-        """
 
         return {"FINISHED"}
 
@@ -389,68 +546,19 @@ class PIPE_OT_Localize_Shared_Collection(Operator):
 
     bl_idname = "pipeline.localize_shared_collection"
     bl_label = "Localize Shared Collection"
-    bl_options = {"REGISTER", "UNDO"}
+    bl_options = {"REGISTER"}
 
     coll: StringProperty()
 
     def execute(self, context):
-        # Capture source data
-        old_scene = context.window.scene
         shared_coll = context.scene.collection.children[self.coll]
-        shared_coll_name = shared_coll.name
-        print(shared_coll_name)
-        shared_coll.ammopipe_localize_collection = True
-        old_scene_parents = [
-            collection
-            for collection in context.scene.collection.children_recursive
-            if shared_coll_name in collection.children
-        ]
-        if shared_coll_name in context.scene.collection.children:
-            old_scene_parents.append(context.scene.collection)
-        print(old_scene_parents)
-        for scene in bpy.data.scenes:
-            if scene.ammopipe_source_scene:
-                source_scene = scene
-                break
-        blocks_recursive_property(old_scene, shared_coll)
-
-        # Create new Scene
-        bpy.ops.scene.new(type="FULL_COPY")
-        scene_temp = context.window.scene
-        scene_temp.name = "_TEMP_COPY"
-        scene_temp.ammopipe_workflow = source_scene.ammopipe_workflow
-        scene_temp.ammopipe_source_scene = False
-
-        # Link the localized collection to the original scene
-        for coll in scene_temp.collection.children:
-            if coll.ammopipe_localize_collection:
-                coll_new = coll
-                coll_new_name = coll_new.name
-                for coll_old in old_scene_parents:
-                    coll_old.children.link(coll_new)
-                    coll_old.children.unlink(shared_coll)
-
-        # Delete the temporary scene
-        bpy.data.scenes.remove(scene_temp, do_unlink=True)
-        bpy.ops.outliner.orphans_purge(
-            do_local_ids=True, do_linked_ids=True, do_recursive=True
-        )
-        context.window.scene = old_scene
-
-        # Naming
-        coll_new = old_scene.collection.children[coll_new_name]
-        for coll_new_child in coll_new.children_recursive:
-            for ob_new in coll_new_child.objects:
-                if ob_new.animation_data and ob_new.animation_data.action:
-                    action = ob_new.animation_data.action
-                    action_source = bpy.data.actions[action.ammopipe_source_action]
-                    ob_new.animation_data.action.name = (
-                        action_source.name + "_" + old_scene.name
-                    )
-                ob_source = bpy.data.objects[ob_new.ammopipe_source_object]
-                ob_new.name = ob_source.name + "_" + old_scene.name
-            coll_new_child.name = coll_new_child.ammopipe_source_collection
-        coll_new.name = shared_coll_name + "_" + old_scene.name
+        # Copy only the shared Collection tree and put it in its place
+        if shared_coll.library is not None:
+            self.report({"ERROR"}, "Linked Collection " + shared_coll.name + " can't be localized")
+            return {"CANCELLED"}
+        with invalidation_batch("Localize Collection"), journal_step(context, "Localize Collection"):
+            coll_new = api.localize(context.scene, shared_coll)
+        self.report({"INFO"}, shared_coll.name + " localized as " + coll_new.name)
 
         return {"FINISHED"}
 
@@ -474,40 +582,74 @@ class PIPE_OT_Set_Filepath_From_Current(Operator):
         return {"FINISHED"}
 
 
+def scene_saved(directory, file_name, fingerprint, temp_path):
+    """on_done of the Scene saving Task, directory is from export_directory()"""
+
+    def on_done(task):
+        if task.status == "DONE":
+            update_export_manifest(directory, {file_name: fingerprint})
+            print("Saved", file_name)
+        else:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            print("Not saved", file_name + ":", task.status.lower(), task.message)
+        directory_scanner.refresh(directory)
+
+    return on_done
+
+
 class PIPE_OT_Save_Scenes_Separately(Operator):
     """Save each Scene as a Separate Blend File"""
 
     bl_idname = "pipeline.save_scenes_separately"
     bl_label = "Save Scenes Separately"
-    bl_options = {"REGISTER", "UNDO"}
+    bl_options = {"REGISTER"}
 
     filepath_new: StringProperty()
     scene_name: StringProperty()
+    all_scenes: BoolProperty(
+        name="All Scenes",
+        description="Save all the Scenes but the Source one",
+        default=False,
+        options={"SKIP_SAVE"},
+    )
+    force: BoolProperty(
+        name="Force",
+        description="Save the Scenes even if their files are up to date",
+        default=False,
+        options={"SKIP_SAVE"},
+    )
 
     @classmethod
     def poll(cls, context):
         return bpy.data.window_managers["WinMan"].ammopipe_scene_save_path.strip()
 
     def execute(self, context):
-        save_path = bpy.data.window_managers["WinMan"].ammopipe_scene_save_path
-        bpy.ops.wm.save_mainfile()
-        path_full = context.blend_data.filepath
-        name = bpy.path.basename(path_full)
-
-        scene_file_name = (
-            name.split(".blend")[0] + "_" + self.scene_name + ".blend"
-        ).replace(
-            "__", "_"
-        )  # reduce underscores just in case
-        filepath_new = self.filepath_new + scene_file_name
-
-        scenes_all = list(bpy.data.scenes)
-        for scene in scenes_all:
-            if scene.name != self.scene_name:
-                bpy.data.scenes.remove(scene)
-        bpy.ops.wm.save_as_mainfile(filepath=filepath_new, copy=True)
-        bpy.ops.wm.open_mainfile(filepath=path_full)
-        bpy.data.window_managers["WinMan"].ammopipe_scene_save_path = save_path
+        if self.all_scenes:
+            scenes = [scene for scene in bpy.data.scenes if not scene.ammopipe_source_scene]
+        else:
+            scenes = [bpy.data.scenes[self.scene_name]]
+        directory = export_directory(self.filepath_new)
+        exports = plan_scene_exports(
+            scenes, directory, fingerprint_cache.fingerprints(), self.force
+        )
+        for scene, blocks, file_name, fingerprint in exports:
+            # Partial write, the open file isn't saved or reloaded. The temp file
+            # goes to the same folder, so that its relative paths hold after the move
+            temp_path = os.path.join(directory, file_name + ".tmp")
+            bpy.data.libraries.write(temp_path, blocks, path_remap="RELATIVE")
+            task_queue.add(
+                Task(
+                    "Save " + scene.name,
+                    move_file,
+                    (temp_path, os.path.join(directory, file_name)),
+                    on_done=scene_saved(directory, file_name, fingerprint, temp_path),
+                )
+            )
+        self.report(
+            {"INFO"},
+            f"Saving {len(exports)} Scenes, {len(scenes) - len(exports)} up to date",
+        )
 
         return {"FINISHED"}
 
@@ -517,7 +659,7 @@ class PIPE_OT_Fix_Name(Operator):
 
     bl_idname = "pipeline.fix_name"
     bl_label = "Fix Name of the Block"
-    bl_options = {"REGISTER", "UNDO"}
+    bl_options = {"REGISTER"}
 
     block: StringProperty()
     collection: StringProperty()
@@ -526,40 +668,60 @@ class PIPE_OT_Fix_Name(Operator):
 
         block = eval(self.block)
         collection = eval(self.collection)
-        block.name = naming_ussues(context.scene, block, collection)
+        with journal_step(context, "Fix Name"):
+            if journal.recording:
+                journal.rename(block, block.name)
+            block.name = naming_ussues(context.scene, block, collection)
+        naming_index.invalidate()
 
         return {"FINISHED"}
 
 
-class PIPE_OT_Fix_Names_All(Operator):
+class PIPE_OT_Fix_Names_All(Chunked_Operator, Operator):
     """Fix Names of All the Blocks"""
 
     bl_idname = "pipeline.fix_names_all"
     bl_label = "Fix Names of All the Blocks"
-    bl_options = {"REGISTER", "UNDO"}
-
-    def execute(self, context):
-
-        collections = [
-            bpy.data.objects,
-            bpy.data.meshes,
-            bpy.data.images,
-            bpy.data.materials,
-            bpy.data.armatures,
-            bpy.data.lattices,
-            bpy.data.cameras,
-            bpy.data.lights,
-        ]
-
-        for block_collection in collections:
-            for block in block_collection:
-                block.name = naming_ussues(context.scene, block, block_collection)
-
-        return {"FINISHED"}
+    bl_options = {"REGISTER"}
+
+    def steps(self, context, progress):
+        # Every block is checked at least once
+        progress.total = sum(len(getattr(bpy.data, attr)) for attr in NAMING_COLLECTIONS)
+        # Read the issues from the index collection by collection:
+        # renamed Objects invalidate the names of their Data
+        renamed = 0
+        collisions = 0
+        for attr in NAMING_COLLECTIONS:
+            yield from progress.track(naming_index.sync_steps(context.scene, (attr,)))
+            renames = {
+                block_name: block_name_new
+                for _attr, block_repr, block_name, block_name_new in naming_index.issues(
+                    context.scene, (attr,)
+                )
+            }
+            if renames:
+                progress.total += len(renames)
+                report = yield from progress.track(
+                    batch_rename_steps(getattr(bpy.data, attr), renames)
+                )
+                renamed += len(report["renamed"])
+                collisions += len(report["collisions"])
+                naming_index.invalidate((attr,))
+                if attr == "objects":
+                    # The next sync goes through the Objects again for their Data
+                    progress.total += len(bpy.data.objects)
+        return (renamed, collisions)
+
+    def done(self, context, result) -> Tuple:
+        renamed, collisions = result
+        if not renamed:
+            # Nothing changed, no undo step
+            return ("CANCELLED", f"Nothing renamed, {collisions} names were taken")
+        return ("FINISHED", f"Renamed {renamed} blocks, {collisions} names were taken")
 
 
 class PIPE_OT_Override_And_Snap_Rigged(Operator):
-    """Override Rigged asset and move Rig to the current Empty's position"""
+    """Override Rigged assets of the selected Empties and move the Rigs to their Empties' positions"""
 
     bl_idname = "pipeline.override_and_snap_rigged"
     bl_label = "Override Rigged asset and move Rig to the current Empty's position"
@@ -567,40 +729,73 @@ class PIPE_OT_Override_And_Snap_Rigged(Operator):
 
     @classmethod
     def poll(cls, context):
-        return (
-            context.active_object
-            and context.active_object.type == "EMPTY"
-            and context.active_object.instance_type == "COLLECTION"
+        return any(is_collection_instance(ob) for ob in context.selected_objects) or (
+            context.active_object and is_collection_instance(context.active_object)
         )
 
     def execute(self, context):
 
-        empty = context.active_object
-        transforms = (
-            empty.location.copy(),
-            empty.rotation_euler.copy(),
-            empty.scale.copy(),
-        )
-        print(transforms)
-        collection = empty.instance_collection
-        reference = None
-        for coll in collection.children_recursive:
-            for ob in coll.objects:
-                if ob.type == "ARMATURE" and ob.name == "RIG-" + collection.name:
-                    reference = ob
-        if not reference:
-            self.report({"ERROR"}, "No rig with proper naming found!")
+        empties = [ob for ob in context.selected_objects if is_collection_instance(ob)]
+        if context.active_object and is_collection_instance(context.active_object):
+            if context.active_object not in empties:
+                empties.append(context.active_object)
+        with invalidation_batch("Override And Snap"):
+            results = api.override_and_snap(empties, context.scene, context.view_layer)
+        failed = [(name, error) for name, error in results if error]
+        for name, error in failed:
+            self.report({"WARNING"}, name + ": " + error)
+        if len(failed) == len(results):
+            self.report({"ERROR"}, "Nothing was overridden")
         else:
-            bpy.ops.object.make_override_library()
-            for ob in bpy.data.objects:
-                if ob.override_library and ob.override_library.reference == reference:
-                    ob.location = transforms[0]
-                    ob.rotation_euler = transforms[1]
-                    ob.scale = transforms[2]
+            self.report(
+                {"INFO"},
+                f"Overridden {len(results) - len(failed)} of {len(results)} instances",
+            )
+
+        return {"FINISHED"}
+
+
+class PIPE_OT_Revert_Last(Operator):
+    """Revert the last change recorded in the AmmoPipe journal"""
+
+    bl_idname = "pipeline.revert_last"
+    bl_label = "AmmoPipe Revert Last"
+    bl_options = {"REGISTER"}
+
+    @classmethod
+    def poll(cls, context):
+        return len(journal.steps) > 0
+
+    def execute(self, context):
+        step = journal.steps[-1]
+        start = time.perf_counter()
+        with invalidation_batch("Revert " + step.name):
+            reverted = revert_journal_step(step)
+        # Kept when the revert failed, not to lose what is still to revert
+        journal.steps.pop()
+        self.report(
+            {"INFO"},
+            f"Reverted {step.name}, {reverted} of {len(step.records)} changes "
+            f"in {time.perf_counter() - start:.2f} s",
+        )
 
         return {"FINISHED"}
 
 
+class PIPE_OT_Cancel_Task(Operator):
+    """Cancel the Background Task"""
+
+    bl_idname = "pipeline.cancel_task"
+    bl_label = "Cancel Task"
+    bl_options = {"REGISTER"}
+
+    uid: IntProperty()
+
+    def execute(self, context):
+        task_queue.cancel(self.uid)
+        return {"FINISHED"}
+
+
 class PIPE_OT_Create_Folders(Operator):
     """Create Project Folders"""
 
@@ -638,16 +833,14 @@ class PIPE_OT_Create_Folders(Operator):
                 for project in context.scene.ammopipe_project_properties
             ]
         )
+        folders = []
         for i in range(len(paths)):
             # Root Project Folder
             project = context.scene.ammopipe_project_properties[i]
             master_path = bpy.path.abspath(paths[i])
             project_name = projects_names[i]
             master_path = os.path.join(master_path, project_name)
-            Path(master_path).mkdir(parents=True, exist_ok=True)
-            self.report(
-                {"INFO"}, f"'{projects_names}' Project folder created at {paths}"
-            )
+            folders.append(master_path)
             # Subfolders
             subfolders = [
                 (prop.identifier, prop.name)
@@ -655,9 +848,7 @@ class PIPE_OT_Create_Folders(Operator):
                 if ("use" in prop.identifier and getattr(project, prop.identifier))
             ]
             for subfolder in subfolders:
-                Path(os.path.join(master_path, subfolder[1])).mkdir(
-                    parents=True, exist_ok=True
-                )
+                folders.append(os.path.join(master_path, subfolder[1]))
                 # Create Scenes
                 if subfolder[1] == "Animatic" or subfolder[1] == "Scenes":
                     if len(project.project_scenes) > 0:
@@ -668,13 +859,19 @@ class PIPE_OT_Create_Folders(Operator):
                                 scene_name = (
                                     scene_name + "_" + project.project_scenes[s].name
                                 )
-                            Path(
+                            folders.append(
                                 os.path.join(master_path, subfolder[1], scene_name)
-                            ).mkdir(parents=True, exist_ok=True)
+                            )
+        # The Projects folder is usually on the file server
+        task_queue.add(Task("Create Project Folders", make_folders, (folders,)))
+        self.report(
+            {"INFO"}, f"Creating '{projects_names}' Project folders at {paths}"
+        )
         return {"FINISHED"}
 
 
 classes = (
+    Lineage_Entry,
     Project_Scenes,
     Project_Properties,
     PIPE_OT_Project_Add,
@@ -685,6 +882,7 @@ classes = (
     PIPE_OT_Incremental_Save,
     PIPE_OT_Unify_Scenes_Names,
     WM_OT_Add_New_Scene,
+    WM_OT_Add_New_Scenes_Batch,
     WM_OT_Delete_Current_Scene,
     PIPE_OT_Set_Source_Scene,
     PIPE_OT_Localize_Shared_Collection,
@@ -697,6 +895,8 @@ classes = (
     PIPE_OT_Fix_Names_All,
     PIPE_OT_Override_And_Snap_Rigged,
     PIPE_OT_Create_Folders,
+    PIPE_OT_Cancel_Task,
+    PIPE_OT_Revert_Last,
 )
 
 
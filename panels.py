@@ -13,6 +13,16 @@ from bpy.props import (
 
 from .functions import *
 from .operators import *
+from .cache import (
+    naming_index,
+    directory_scanner,
+    fingerprint_cache,
+    panel_rows,
+    workflows,
+    NAMING_ICONS,
+)
+from .tasks import task_queue
+from .journal import journal
 
 
 class PIPE_PT_AmmoPipe_Scenes_Workflow_Panel(Panel):
@@ -25,21 +35,16 @@ class PIPE_PT_AmmoPipe_Scenes_Workflow_Panel(Panel):
 
     def draw(self, context):
         layout = self.layout
-        if any(
-            scene for scene in bpy.data.scenes if scene.ammopipe_workflow == "Asset"
-        ):
+        in_use = workflows()
+        if "Asset" in in_use:
             asset_icon = "CHECKBOX_HLT"
         else:
             asset_icon = "CHECKBOX_DEHLT"
-        if any(
-            scene for scene in bpy.data.scenes if scene.ammopipe_workflow == "Layout"
-        ):
+        if "Layout" in in_use:
             layout_icon = "CHECKBOX_HLT"
         else:
             layout_icon = "CHECKBOX_DEHLT"
-        if any(
-            scene for scene in bpy.data.scenes if scene.ammopipe_workflow == "Project"
-        ):
+        if "Project" in in_use:
             project_icon = "CHECKBOX_HLT"
         else:
             project_icon = "CHECKBOX_DEHLT"
@@ -54,6 +59,14 @@ class PIPE_PT_AmmoPipe_Scenes_Workflow_Panel(Panel):
         row.operator(
             PIPE_OT_Set_Workflow_Project.bl_idname, text="Project", icon=project_icon
         )
+        row = layout.row(align=True)
+        row.prop(context.window_manager, "ammopipe_journal")
+        if journal.steps:
+            row.operator(
+                PIPE_OT_Revert_Last.bl_idname,
+                text="Revert " + journal.steps[-1].name,
+                icon="LOOP_BACK",
+            )
 
 
 class PIPE_PT_AmmoPipe_Naming_Panel(Panel):
@@ -66,9 +79,7 @@ class PIPE_PT_AmmoPipe_Naming_Panel(Panel):
 
     @classmethod
     def poll(cls, context):
-        return any(
-            scene for scene in bpy.data.scenes if scene.ammopipe_workflow == "Asset"
-        )
+        return "Asset" in workflows()
 
     def draw(self, context):
         layout = self.layout
@@ -139,24 +150,9 @@ class PIPE_PT_AmmoPipe_Naming_Issues_Panel(Panel):
         scene = context.scene
         col = layout.column(align=True)
 
-        collections = {
-            bpy.data.objects: ("OBJECT_DATAMODE", "bpy.data.objects"),
-            bpy.data.meshes: ("MESH_DATA", "bpy.data.meshes"),
-            bpy.data.images: ("IMAGE_DATA", "bpy.data.images"),
-            bpy.data.materials: ("MATERIAL", "bpy.data.materials"),
-            bpy.data.armatures: ("ARMATURE_DATA", "bpy.data.armatures"),
-            bpy.data.lattices: ("LATTICE_DATA", "bpy.data.lattices"),
-            bpy.data.cameras: ("CAMERA_DATA", "bpy.data.cameras"),
-            bpy.data.lights: ("LIGHT_DATA", "bpy.data.lights"),
-        }
-        if not any(
-            [
-                block
-                for block in block_collection
-                if block.name != naming_ussues(scene, block, block_collection)
-            ]
-            for block_collection in collections.keys()
-        ):
+        # Issues are kept in the index and re-validated only for the changed blocks
+        issues = naming_index.issues(scene)
+        if not issues:
             row = col.row()
             row.label(text="All names are standardized!")
         else:
@@ -167,22 +163,20 @@ class PIPE_PT_AmmoPipe_Naming_Issues_Panel(Panel):
             row = col.row()
             row.separator(factor=2.0)
 
-        for block_collection in collections.keys():
-            for block in block_collection:
-                if block.name != naming_ussues(scene, block, block_collection):
-                    row = col.row()
-                    row.label(icon=collections[block_collection][0])
-                    row.label(text=block.name)
-                    row.label(icon="RIGHTARROW_THIN")
-                    row.label(text=naming_ussues(scene, block, block_collection))
-                    rename = row.operator(
-                        PIPE_OT_Fix_Name.bl_idname,
-                        text="",
-                        icon="SORTALPHA",
-                        emboss=True,
-                    )
-                    rename.block = repr(block)
-                    rename.collection = collections[block_collection][1]
+        for attr, block_repr, block_name, block_name_new in issues:
+            row = col.row()
+            row.label(icon=NAMING_ICONS[attr])
+            row.label(text=block_name)
+            row.label(icon="RIGHTARROW_THIN")
+            row.label(text=block_name_new)
+            rename = row.operator(
+                PIPE_OT_Fix_Name.bl_idname,
+                text="",
+                icon="SORTALPHA",
+                emboss=True,
+            )
+            rename.block = block_repr
+            rename.collection = "bpy.data." + attr
 
 
 class PIPE_PT_AmmoPipe_Overrides_Panel(Panel):
@@ -195,11 +189,7 @@ class PIPE_PT_AmmoPipe_Overrides_Panel(Panel):
 
     @classmethod
     def poll(cls, context):
-        return not any(
-            scene
-            for scene in bpy.data.scenes
-            if scene.ammopipe_workflow in ("Asset", "Project")
-        )
+        return not workflows() & {"Asset", "Project"}
 
     def draw(self, context):
         layout = self.layout
@@ -222,9 +212,7 @@ class PIPE_PT_AmmoPipe_Versioning_Panel(Panel):
 
     @classmethod
     def poll(cls, context):
-        return not any(
-            scene for scene in bpy.data.scenes if scene.ammopipe_workflow == "Project"
-        )
+        return "Project" not in workflows()
 
     def draw(self, context):
         layout = self.layout
@@ -244,14 +232,14 @@ class PIPE_PT_AmmoPipe_Versioning_Panel(Panel):
             row = col.row(align=True)
             row.label(text="Next version is:")
             row = col.row(align=True)
-            name = os.path.splitext(os.path.basename(directory_files()[2]))[0]
-            new_name = (
-                next_relative_name(
-                    directory_files()[1], name, scene.ammopipe_version_step
-                )
-                + ".blend"
-            )
-            row.label(text=new_name)
+            # The folder is listed by the background scanner
+            index = directory_scanner.get(os.path.dirname(bpy.data.filepath))
+            if index is None:
+                row.label(text="Scanning the folder...", icon="SORTTIME")
+            else:
+                name = os.path.splitext(os.path.basename(bpy.data.filepath))[0]
+                new_name = index.next_name(name, scene.ammopipe_version_step) + ".blend"
+                row.label(text=new_name)
 
 
 class PIPE_PT_AmmoPipe_Scenes_Management_Panel(Panel):
@@ -265,13 +253,7 @@ class PIPE_PT_AmmoPipe_Scenes_Management_Panel(Panel):
 
     @classmethod
     def poll(cls, context):
-        for scene in bpy.data.scenes:
-            if (
-                scene.ammopipe_workflow == "Asset"
-                or scene.ammopipe_workflow == "Project"
-            ):
-                return False
-        return True
+        return not workflows() & {"Asset", "Project"}
 
     def draw(self, context):
         layout = self.layout
@@ -297,6 +279,10 @@ class PIPE_PT_AmmoPipe_Scenes_Management_Panel(Panel):
         row.operator(
             WM_OT_Delete_Current_Scene.bl_idname, text="Delete Scene", icon="TRASH"
         )
+        row = col.row(align=True)
+        row.operator(
+            WM_OT_Add_New_Scenes_Batch.bl_idname, text="New from Shots List", icon="SEQUENCE"
+        )
 
 
 class PIPE_PT_AmmoPipe_Scenes_Naming_Panel(Panel):
@@ -345,21 +331,17 @@ class PIPE_PT_AmmoPipe_Scene_Collections_Localize_Panel(Panel):
                 text="Localize function is redundant for the Source Scene", icon="ERROR"
             )
             return
-        if any(
-            coll
-            for coll in scene.collection.children
-            if coll.ammopipe_collection_share_enum == "Link"
-        ):
-            for collection in scene.collection.children:
-                if collection.ammopipe_collection_share_enum == "Link":
-                    row = col.row()
-                    row.label(text=collection.name, icon="OUTLINER_COLLECTION")
-                    localize = row.operator(
-                        PIPE_OT_Localize_Shared_Collection.bl_idname,
-                        text="Localize",
-                        icon="LIBRARY_DATA_OVERRIDE",
-                    )
-                    localize.coll = collection.name
+        shared = panel_rows.shared_collections(scene)
+        if shared:
+            for name in shared:
+                row = col.row()
+                row.label(text=name, icon="OUTLINER_COLLECTION")
+                localize = row.operator(
+                    PIPE_OT_Localize_Shared_Collection.bl_idname,
+                    text="Localize",
+                    icon="LIBRARY_DATA_OVERRIDE",
+                )
+                localize.coll = name
         else:
             row = col.row()
             row.label(text="No Collection to Localize", icon="ERROR")
@@ -383,23 +365,22 @@ class PIPE_PT_AmmoPipe_Scenes_Collections_Panel(Panel):
         row = col.row()
         row.label(text="Scene Collections:", icon="OUTLINER_COLLECTION")
 
-        source_scene = None
-        for scene in bpy.data.scenes:
-            if scene.ammopipe_source_scene:
-                source_scene = scene
-        if source_scene:
-            for coll in source_scene.collection.children_recursive:
-                if (
-                    not coll.override_library
-                    and coll.name in source_scene.collection.children
-                ):
-                    split = col.split(factor=0.6)
-                    col1 = split.column()
-                    row = col1.row()
-                    row.label(text=coll.name)
-                    col2 = split.column()
-                    row = col2.row()
-                    row.prop(coll, "ammopipe_collection_share_enum", expand=True)
+        source_name, coll_names = panel_rows.source_collections()
+        source = bpy.data.scenes.get(source_name) if source_name else None
+        if source is not None:
+            children = source.collection.children
+            for name in coll_names:
+                # The rows can be a redraw behind a rename or a removal
+                coll = children.get(name)
+                if coll is None:
+                    continue
+                split = col.split(factor=0.6)
+                col1 = split.column()
+                row = col1.row()
+                row.label(text=name)
+                col2 = split.column()
+                row = col2.row()
+                row.prop(coll, "ammopipe_collection_share_enum", expand=True)
 
         else:
             row = layout.row()
@@ -418,13 +399,7 @@ class PIPE_PT_AmmoPipe_Scenes_Save_Panel(Panel):
 
     @classmethod
     def poll(cls, context):
-        for scene in bpy.data.scenes:
-            if (
-                scene.ammopipe_workflow == "Asset"
-                or scene.ammopipe_workflow == "Project"
-            ):
-                return False
-        return True
+        return not workflows() & {"Asset", "Project"}
 
     def draw(self, context):
         layout = self.layout
@@ -453,41 +428,75 @@ class PIPE_PT_AmmoPipe_Scenes_Save_Panel(Panel):
             bpy.data.is_saved
             and bpy.data.window_managers["WinMan"].ammopipe_scene_save_path.strip()
         ):
-            files = directory_files_given(
-                bpy.data.window_managers["WinMan"].ammopipe_scene_save_path
-            )[1]
-            path_full = context.blend_data.filepath
-            name = bpy.path.basename(path_full)
+            exports = directory_scanner.get_exports(
+                export_directory(bpy.data.window_managers["WinMan"].ammopipe_scene_save_path)
+            )
+            fingerprints = fingerprint_cache.cached()
         else:
             row = col.row()
             row.label(text="Set the Scenes Save Path!", icon="ERROR")
             return
 
-        for scene in bpy.data.scenes:
-            if not scene.ammopipe_source_scene:
-                scene_file_name = (
-                    name.split(".blend")[0] + "_" + scene.name + ".blend"
-                ).replace("__", "_")
-                row_name = col1.row()
-                row_name.label(text=scene.name, icon="SCENE_DATA")
-                row_name = col1.row()
-                row_name.separator(factor=0.5)
-                row_save = col2.row()
-                if scene_file_name.replace(".blend", "") in files:
-                    text = "Saved!"
-                    icon = "CHECKMARK"
-                else:
-                    text = "Save Scene"
-                    icon = "FILE_BLEND"
-                save = row_save.operator(
-                    PIPE_OT_Save_Scenes_Separately.bl_idname, text=text, icon=icon
-                )
-                save.filepath_new = bpy.data.window_managers[
-                    "WinMan"
-                ].ammopipe_scene_save_path
-                save.scene_name = scene.name
-                row_save = col2.row()
-                row_save.separator(factor=0.5)
+        save_path = bpy.data.window_managers["WinMan"].ammopipe_scene_save_path
+        for scene_name, text, icon in panel_rows.saved_scenes(exports, fingerprints):
+            row_name = col1.row()
+            row_name.label(text=scene_name, icon="SCENE_DATA")
+            row_name = col1.row()
+            row_name.separator(factor=0.5)
+            row_save = col2.row()
+            save = row_save.operator(
+                PIPE_OT_Save_Scenes_Separately.bl_idname, text=text, icon=icon
+            )
+            save.filepath_new = save_path
+            save.scene_name = scene_name
+            row_save = col2.row()
+            row_save.separator(factor=0.5)
+        row = col.row()
+        save_all = row.operator(
+            PIPE_OT_Save_Scenes_Separately.bl_idname, text="Save All Scenes", icon="FILE_BLEND"
+        )
+        save_all.filepath_new = save_path
+        save_all.all_scenes = True
+
+
+class PIPE_PT_AmmoPipe_Tasks_Panel(Panel):
+    """Ammonite Pipeline Background Tasks Panel"""
+
+    bl_space_type = "VIEW_3D"
+    bl_region_type = "UI"
+    bl_category = "AmmoPipe"
+    bl_label = "Background Tasks"
+
+    @classmethod
+    def poll(cls, context):
+        return len(task_queue.tasks) > 0
+
+    def draw(self, context):
+        layout = self.layout
+
+        col = layout.column(align=True)
+        row = col.row()
+        row.prop(context.window_manager, "ammopipe_tasks_limit")
+        icons = {
+            "QUEUED": "SORTTIME",
+            "RUNNING": "PLAY",
+            "DONE": "CHECKMARK",
+            "FAILED": "ERROR",
+            "CANCELLED": "CANCEL",
+        }
+        for task in task_queue.tasks:
+            row = col.row(align=True)
+            row.label(text=task.name, icon=icons[task.status])
+            if task.status == "RUNNING" and task.progress:
+                row.label(text=f"{task.progress:.0%}")
+            else:
+                row.label(text=task.status.capitalize())
+            if not task.over:
+                cancel = row.operator(PIPE_OT_Cancel_Task.bl_idname, text="", icon="X")
+                cancel.uid = task.uid
+            if task.status == "FAILED" and task.message:
+                row = col.row()
+                row.label(text=task.message)
 
 
 class PIPE_PT_AmmoPipe_Project_Panel(Panel):
@@ -500,9 +509,7 @@ class PIPE_PT_AmmoPipe_Project_Panel(Panel):
 
     @classmethod
     def poll(cls, context):
-        return any(
-            scene for scene in bpy.data.scenes if scene.ammopipe_workflow == "Project"
-        )
+        return "Project" in workflows()
 
     def draw(self, context):
         layout = self.layout
@@ -670,6 +677,7 @@ classes = (
     PIPE_PT_AmmoPipe_Scene_Collections_Localize_Panel,
     PIPE_PT_AmmoPipe_Scenes_Save_Panel,
     PIPE_PT_AmmoPipe_Project_Panel,
+    PIPE_PT_AmmoPipe_Tasks_Panel,
 )
 
 
@@ -743,6 +751,7 @@ def register():
         description="Share or Copy this Collection among the other Scenes",
         default="Link",
     )
+    # Not written anymore, kept for the files made with the older versions
     bpy.types.Collection.ammopipe_source_collection = StringProperty(default="")
     bpy.types.Collection.ammopipe_localize_collection = BoolProperty(
         name="Collection Marked for being Localized",
@@ -751,6 +760,13 @@ def register():
     )
     bpy.types.Object.ammopipe_source_object = StringProperty(default="")
     bpy.types.Action.ammopipe_source_action = StringProperty(default="")
+    for id_type in (bpy.types.Collection, bpy.types.Object, bpy.types.Action):
+        id_type.ammopipe_uid = IntProperty(
+            name="AmmoPipe ID",
+            description="Identifies the block in the Scenes copies registry",
+            default=0,
+        )
+    bpy.types.Scene.ammopipe_lineage = CollectionProperty(type=Lineage_Entry)
     bpy.types.Scene.ammopipe_scene_name_suffix = StringProperty(
         name="Name Suffix",
         description="Scene Name Custom Suffix",
@@ -761,6 +777,18 @@ def register():
         description="Use This Scene as Source",
         default=False,
     )
+    bpy.types.WindowManager.ammopipe_tasks_limit = IntProperty(
+        name="Tasks at Once",
+        description="How many Background Tasks may run at the same time, \nkeep it low not to saturate the file server",
+        default=2,
+        min=1,
+        max=16,
+    )
+    bpy.types.WindowManager.ammopipe_journal = BoolProperty(
+        name="Journal",
+        description="Record the bulk operators in a journal instead of the global Undo, \nmuch lighter on the huge files. Use \"AmmoPipe Revert Last\" to revert them",
+        default=False,
+    )
     bpy.types.WindowManager.ammopipe_scene_save_path = bpy.props.StringProperty(
         name="Scene Save Path",
         description="",
@@ -802,8 +830,14 @@ def unregister():
     del bpy.types.Collection.ammopipe_localize_collection
     del bpy.types.Object.ammopipe_source_object
     del bpy.types.Action.ammopipe_source_action
+    del bpy.types.Collection.ammopipe_uid
+    del bpy.types.Object.ammopipe_uid
+    del bpy.types.Action.ammopipe_uid
+    del bpy.types.Scene.ammopipe_lineage
     del bpy.types.Scene.ammopipe_scene_name_suffix
     del bpy.types.Scene.ammopipe_source_scene
     del bpy.types.WindowManager.ammopipe_scene_save_path
+    del bpy.types.WindowManager.ammopipe_tasks_limit
+    del bpy.types.WindowManager.ammopipe_journal
     del bpy.types.Scene.ammopipe_workflow
     del bpy.types.Scene.ammopipe_project_properties
@@ -0,0 +1,170 @@
+import bpy
+import itertools
+import os
+import shutil
+import threading
+import time
+
+
+class TaskCancelled(Exception):
+    """Raised by the task functions that stop because they were cancelled"""
+
+
+class Task:
+    """A job run off the UI thread.
+    function(task, *args) runs in a worker thread, it may set task.progress
+    and task.message, and should call task.check_cancelled() between its steps.
+    The task is DONE when the function returns, even if it was cancelled too late.
+    on_done(task) is called on the main thread when the task is over"""
+
+    _uids = itertools.count(1)
+
+    def __init__(self, name, function, args=(), on_done=None):
+        self.uid = next(self._uids)
+        self.name = name
+        self.function = function
+        self.args = args
+        self.on_done = on_done
+        # QUEUED, RUNNING, DONE, FAILED or CANCELLED
+        self.status = "QUEUED"
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.started = None
+        self.finished = None
+        self.thread = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def over(self) -> bool:
+        return self.status in {"DONE", "FAILED", "CANCELLED"}
+
+    def check_cancelled(self):
+        if self.cancelled:
+            raise TaskCancelled()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _run(self):
+        try:
+            self.result = self.function(self, *self.args)
+            self.status = "DONE"
+        except TaskCancelled:
+            self.status = "CANCELLED"
+        except Exception as error:
+            self.status = "CANCELLED" if self.cancelled else "FAILED"
+            self.message = str(error)
+            print("AmmoPipe task failed:", self.name, error)
+        self.finished = time.monotonic()
+
+
+def move_file(task, source, destination):
+    """Task function: move the file, e.g. from the local temp folder to the file server.
+    Once started it isn't stopped half way"""
+    task.check_cancelled()
+    shutil.move(source, destination)
+
+
+def make_folders(task, paths):
+    """Task function: create the folders with their parents"""
+    for i, path in enumerate(paths):
+        task.check_cancelled()
+        os.makedirs(path, exist_ok=True)
+        task.progress = (i + 1) / len(paths)
+
+
+class TaskQueue:
+    """Tasks waiting and running, at most WindowManager.ammopipe_tasks_limit at once.
+    A timer on the main thread starts them and hands the finished ones to on_done()"""
+
+    # Finished Tasks kept for the panel
+    keep_finished = 8
+
+    def __init__(self):
+        self.tasks = []
+        # Timers are told apart by the function object, a bound method is a new one every time
+        self.timer = self.poll
+
+    def add(self, task) -> Task:
+        self.tasks.append(task)
+        if not bpy.app.timers.is_registered(self.timer):
+            bpy.app.timers.register(self.timer, persistent=True)
+        return task
+
+    def get(self, uid):
+        for task in self.tasks:
+            if task.uid == uid:
+                return task
+        return None
+
+    def cancel(self, uid):
+        task = self.get(uid)
+        if task is None or task.over:
+            return
+        task.cancel()
+        if task.status == "QUEUED":
+            task.status = "CANCELLED"
+            task.finished = time.monotonic()
+
+    @property
+    def active(self) -> list:
+        return [task for task in self.tasks if not task.over]
+
+    def poll(self):
+        """Timer on the main thread"""
+        try:
+            limit = bpy.context.window_manager.ammopipe_tasks_limit
+        except AttributeError:
+            limit = 2
+        running = [task for task in self.tasks if task.status == "RUNNING"]
+        for task in self.tasks:
+            if len(running) >= limit:
+                break
+            if task.status == "QUEUED":
+                task.status = "RUNNING"
+                task.started = time.monotonic()
+                task.thread = threading.Thread(
+                    target=task._run, name="AmmoPipe " + task.name, daemon=True
+                )
+                task.thread.start()
+                running.append(task)
+        for task in self.tasks:
+            # on_done runs once, after the thread is gone
+            alive = task.thread is not None and task.thread.is_alive()
+            if task.over and task.on_done is not None and not alive:
+                on_done, task.on_done = task.on_done, None
+                try:
+                    on_done(task)
+                except Exception as error:
+                    print("AmmoPipe task callback failed:", task.name, error)
+        finished = [task for task in self.tasks if task.over and task.on_done is None]
+        for task in finished[: max(0, len(finished) - self.keep_finished)]:
+            self.tasks.remove(task)
+
+        for window in bpy.context.window_manager.windows:
+            for area in window.screen.areas:
+                if area.type == "VIEW_3D":
+                    area.tag_redraw()
+        if self.active:
+            return 0.1
+        # Nothing to watch until the next add()
+        return None
+
+    def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        if bpy.app.timers.is_registered(self.timer):
+            bpy.app.timers.unregister(self.timer)
+        self.tasks.clear()
+
+
+task_queue = TaskQueue()
+
+
+def unregister():
+    task_queue.stop()